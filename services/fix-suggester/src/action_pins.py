@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Pin database: a JSON object of "owner/repo@ref": "sha # version" entries, or a
+# SQLite file (.db, .sqlite) with an action_pins(action, ref, sha, version) table.
+ACTION_PINS_PATH = os.getenv("ACTION_PINS_PATH", os.path.join(os.path.dirname(__file__), "action_pins.json"))
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+COMMIT_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+class Pin(NamedTuple):
+    sha: str
+    version: str
+
+
+class ActionRef(NamedTuple):
+    """A parsed uses: value, e.g. github/codeql-action/init@v3."""
+    repo: str  # owner/repo
+    path: str  # action directory or workflow file in the repo, with its leading slash
+    ref: str
+
+    def pinned(self, pin: Pin) -> str:
+        return f"{self.repo}{self.path}@{pin.sha}"
+
+
+def parse_uses(value: str) -> Optional[ActionRef]:
+    """The action a uses: value refers to, or None for local actions and Docker images."""
+    if value.startswith(("./", "docker://")):
+        return None
+    action, at, ref = value.rpartition("@")
+    parts = action.split("/", 2)
+    if not at or not ref or len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+    return ActionRef(f"{parts[0]}/{parts[1]}", "/" + parts[2] if len(parts) == 3 else "", ref)
+
+
+def _pin_key(action: str, ref: str) -> Tuple[str, str]:
+    return action.lower(), ref  # GitHub owner and repo names are case-insensitive
+
+
+class PinSet:
+    """One loaded set of pins and its version; never changed once built."""
+
+    def __init__(self, pins: Dict[Tuple[str, str], Pin]):
+        self._pins = pins
+        self.version = hashlib.sha256(repr(sorted(pins.items())).encode()).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self._pins)
+
+    def lookup(self, action: ActionRef) -> Optional[Pin]:
+        return self._pins.get(_pin_key(action.repo, action.ref))
+
+
+class ActionPins:
+    """Commit SHA and version of each pinned owner/repo@ref, read from ACTION_PINS_PATH.
+
+    Entries live in a dict keyed by (owner/repo, ref), so a lookup is a single
+    hash probe however many pins the file holds; actions in a subdirectory of a
+    repo share the repo's pins. refresh() reloads the file once its mtime or
+    size changes. A file that fails to load leaves the current pins in place.
+    Each load is swapped in as a whole PinSet, so a request working from
+    snapshot() sees one version of the pins throughout.
+    """
+
+    def __init__(self, path: str = ACTION_PINS_PATH):
+        self.path = path
+        self._current = PinSet({})
+        self._loaded_fingerprint = None
+        self._failed_fingerprint = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    @property
+    def version(self) -> str:
+        """Hash of the loaded pins, part of the fix cache key."""
+        return self._current.version
+
+    def lookup(self, action: ActionRef) -> Optional[Pin]:
+        return self._current.lookup(action)
+
+    def snapshot(self) -> PinSet:
+        """The pins currently loaded, unaffected by later reloads."""
+        return self._current
+
+    def reload(self) -> int:
+        """Load the pin file and swap in its pins; returns how many were loaded."""
+        with self._lock:
+            fingerprint = self._fingerprint()
+            if fingerprint is None:
+                print(f"No action pin database found at {self.path}")
+                pins = {}
+            elif self.path.endswith(SQLITE_SUFFIXES):
+                pins = self._load_sqlite()
+            else:
+                pins = self._load_json()
+            self._current = PinSet(pins)
+            self._loaded_fingerprint = fingerprint
+            return len(pins)
+
+    def refresh(self):
+        """Reload if the pin file changed since it was last loaded."""
+        current = self._fingerprint()
+        if current in (self._loaded_fingerprint, self._failed_fingerprint):
+            return
+        try:
+            print(f"Reloaded action pins: {self.reload()} pins")
+        except Exception as e:
+            self._failed_fingerprint = current
+            print(f"Action pin reload failed, keeping current pins: {e}")
+
+    def _fingerprint(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_json(self) -> Dict[Tuple[str, str], Pin]:
+        with open(self.path, encoding="utf-8") as f:
+            entries = json.load(f)
+        pins = {}
+        for uses, pinned in entries.items():
+            action = parse_uses(uses)
+            if action is None or action.path:
+                raise ValueError(f"Invalid action pin key {uses!r}, expected owner/repo@ref")
+            sha, _, version = pinned.partition(" # ")
+            pins[_pin_key(action.repo, action.ref)] = self._pin(uses, sha.strip(), version.strip() or action.ref)
+        return pins
+
+    def _load_sqlite(self) -> Dict[Tuple[str, str], Pin]:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT action, ref, sha, version FROM action_pins").fetchall()
+        finally:
+            conn.close()
+        return {
+            _pin_key(action, ref): self._pin(f"{action}@{ref}", sha, version or ref)
+            for action, ref, sha, version in rows
+        }
+
+    @staticmethod
+    def _pin(uses: str, sha: str, version: str) -> Pin:
+        if not COMMIT_SHA.match(sha):
+            raise ValueError(f"Action pin {uses!r} is not a full commit SHA: {sha!r}")
+        return Pin(sha, version)
+
+
+action_pins = ActionPins()
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import zlib
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Blob
+
+# Compress blobs with zlib ("zlib") or store them as plain text ("none").
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zlib").lower()
+# Text shorter than this many bytes is never compressed.
+BLOB_COMPRESS_MIN_BYTES = int(os.getenv("BLOB_COMPRESS_MIN_BYTES", "256"))
+
+# Inserts supporting ON CONFLICT, per database backend.
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def insert_ignore(db: AsyncSession, model, rows: List[Dict]):
+    """Insert rows, skipping those whose primary key another request stored first."""
+    insert = DIALECT_INSERTS.get(db.bind.dialect.name)
+    if insert is None:
+        db.add_all(model(**row) for row in rows)
+    else:
+        keys = [column.name for column in model.__table__.primary_key]
+        await db.execute(insert(model).on_conflict_do_nothing(index_elements=keys), rows)
+
+
+def blob_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode(text: str) -> Dict:
+    data = text.encode("utf-8")
+    if BLOB_COMPRESSION == "zlib" and len(data) >= BLOB_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return {"data": compressed, "compression": "zlib", "size": len(data)}
+    return {"data": data, "compression": None, "size": len(data)}
+
+
+def _decode(blob: Blob) -> str:
+    data = zlib.decompress(blob.data) if blob.compression == "zlib" else blob.data
+    return data.decode("utf-8")
+
+
+async def store_blobs(db: AsyncSession, texts: Iterable[str]) -> List[str]:
+    """Store each distinct text once and return the hash of every text, in order.
+
+    Texts already in the blobs table are neither encoded nor sent again.
+    The caller commits.
+    """
+    texts = list(texts)
+    hashes = [blob_hash(text) for text in texts]
+    missing = dict(zip(hashes, texts))
+    if missing:
+        stored = await db.execute(select(Blob.hash).where(Blob.hash.in_(list(missing))))
+        for (digest,) in stored:
+            del missing[digest]
+    if missing:
+        await insert_ignore(db, Blob, [{"hash": digest, **_encode(text)} for digest, text in missing.items()])
+    return hashes
+
+
+async def load_blobs(db: AsyncSession, hashes: Iterable[str]) -> Dict[str, str]:
+    """Text of each stored hash; hashes not in the table are left out."""
+    hashes = {digest for digest in hashes if digest}
+    if not hashes:
+        return {}
+    blobs = (await db.execute(select(Blob).where(Blob.hash.in_(hashes)))).scalars()
+    return {blob.hash: _decode(blob) for blob in blobs}
@@ -1,7 +1,120 @@
-import diff_match_patch as dmp_module
-from typing import List, Tuple
+import time
+from typing import List, Optional, Tuple
 
-def generate_unified_diff(original: str, fixed: str, context_lines: int = 3) -> str:
+# Edit distance, in lines, beyond which the differing region is reported as one change
+MAX_DIFF_EDITS = 10000
+# Seconds the line diff may take before the same fallback
+DIFF_TIMEOUT = 1.0
+
+def _myers(a: List[int], b: List[int], max_edits: int, deadline: Optional[float]) -> Optional[List[Tuple[int, int, int, int]]]:
+    """
+    Find a shortest line edit script with Myers' O(ND) algorithm.
+    
+    Args:
+        a: Original lines, as integer ids
+        b: Fixed lines, as integer ids
+        max_edits: Largest edit distance to search for
+        deadline: time.monotonic() value to give up at, or None
+        
+    Returns:
+        Sorted (original start, original end, fixed start, fixed end) changes,
+        or None if the budget ran out
+    """
+    n, m = len(a), len(b)
+    max_d = min(n + m, max_edits)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    
+    for d in range(max_d + 1):
+        if deadline is not None and d % 64 == 0 and time.monotonic() > deadline:
+            return None
+        trace.append(v[offset - d:offset + d + 1])  # furthest x per diagonal before this round
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]  # down: insert b[y]
+            else:
+                x = v[offset + k - 1] + 1  # right: delete a[x]
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m, d)
+    return None
+
+def _backtrack(trace: List[List[int]], n: int, m: int, d: int) -> List[Tuple[int, int, int, int]]:
+    changes = []
+    x, y = n, m
+    for depth in range(d, 0, -1):
+        # Furthest x per diagonal -depth .. depth before round depth, as saved by _myers
+        previous = trace[depth]
+        k = x - y
+        if k == -depth or (k != depth and previous[depth + k - 1] < previous[depth + k + 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = previous[depth + previous_k]
+        previous_y = previous_x - previous_k
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+        # One edit from (previous_x, previous_y) to (x, y)
+        if changes and changes[-1][0] == x and changes[-1][2] == y:
+            start = changes.pop()
+            changes.append((previous_x, start[1], previous_y, start[3]))
+        else:
+            changes.append((previous_x, x, previous_y, y))
+        x, y = previous_x, previous_y
+    changes.reverse()
+    return changes
+
+def diff_lines(original_lines: List[str], fixed_lines: List[str], max_edits: int = MAX_DIFF_EDITS,
+               timeout: Optional[float] = DIFF_TIMEOUT) -> List[Tuple[int, int, int, int]]:
+    """
+    Compare two lists of lines.
+    
+    Lines shared at the start and end are skipped before running Myers'
+    algorithm on the rest. If the budget runs out, everything between the
+    shared start and end is reported as a single change.
+    
+    Args:
+        original_lines: Lines of the original YAML
+        fixed_lines: Lines of the fixed YAML
+        max_edits: Largest edit distance to search for
+        timeout: Seconds to search for, or None for no limit
+        
+    Returns:
+        Sorted (original start, original end, fixed start, fixed end) changes
+    """
+    prefix = 0
+    limit = min(len(original_lines), len(fixed_lines))
+    while prefix < limit and original_lines[prefix] == fixed_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and original_lines[-1 - suffix] == fixed_lines[-1 - suffix]:
+        suffix += 1
+    
+    original_end, fixed_end = len(original_lines) - suffix, len(fixed_lines) - suffix
+    if prefix == original_end or prefix == fixed_end:
+        if prefix == original_end and prefix == fixed_end:
+            return []
+        return [(prefix, original_end, prefix, fixed_end)]
+    
+    # Compare lines as small integers
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in original_lines[prefix:original_end]]
+    b = [ids.setdefault(line, len(ids)) for line in fixed_lines[prefix:fixed_end]]
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    changes = _myers(a, b, max_edits, deadline)
+    if changes is None:
+        return [(prefix, original_end, prefix, fixed_end)]
+    return [(a_start + prefix, a_end + prefix, b_start + prefix, b_end + prefix)
+            for a_start, a_end, b_start, b_end in changes]
+
+def generate_unified_diff(original: str, fixed: str, context_lines: int = 3,
+                          max_edits: int = MAX_DIFF_EDITS, timeout: Optional[float] = DIFF_TIMEOUT) -> str:
     """
     Generate a unified diff between original and fixed YAML content.
     
@@ -9,59 +122,151 @@ def generate_unified_diff(original: str, fixed: str, context_lines: int = 3) ->
         original: Original YAML content
         fixed: Fixed YAML content
         context_lines: Number of context lines to include
+        max_edits: Largest edit distance to search for, see diff_lines
+        timeout: Seconds to search for, see diff_lines
         
     Returns:
-        Unified diff string with comments
+        Unified diff string
     """
-    dmp = dmp_module.diff_match_patch()
-    
-    # Create diffs
-    diffs = dmp.diff_main(original, fixed)
-    dmp.diff_cleanupSemantic(diffs)
+    original_lines = _with_newlines(original.split('\n'))
+    fixed_lines = _with_newlines(fixed.split('\n'))
+    changes = [
+        (a_start, original_lines[a_start:a_end], b_start, fixed_lines[b_start:b_end])
+        for a_start, a_end, b_start, b_end in diff_lines(original_lines, fixed_lines, max_edits, timeout)
+    ]
+    return format_unified_diff(changes, fixed_lines, len(original_lines), context_lines)
+
+def _with_newlines(lines: List[str], start: int = 0, length: Optional[int] = None) -> List[str]:
+    """
+    Turn lines of a text split on newlines into the lines format_unified_diff takes.
     
-    # Convert to patch
-    patches = dmp.patch_make(original, diffs)
-    patch_text = dmp.patch_toText(patches)
+    Every line but the last of the text gets back its newline, and an
+    empty last line, the text's final newline, is dropped.
     
-    # Format as unified diff
-    lines_original = original.split('\n')
-    lines_fixed = fixed.split('\n')
+    Args:
+        lines: Lines of the text, from index start
+        start: Index of the first of lines in the text
+        length: Number of lines of the whole split text, len(lines) by default
+        
+    Returns:
+        Lines ending with a newline, except a last line without one
+    """
+    if length is None:
+        length = start + len(lines)
+    result = []
+    for index, line in enumerate(lines, start):
+        if index < length - 1:
+            result.append(line + '\n')
+        elif line:
+            result.append(line)
+    return result
+
+def _diff_line(prefix: str, line: str) -> str:
+    if line.endswith('\n'):
+        return prefix + line[:-1]
+    return f"{prefix}{line}\n\\ No newline at end of file"
+
+def _format_range(start: int, length: int) -> str:
+    # Unified diff ranges: 1-based start, count omitted when 1, and the
+    # line before the hunk as start when it is empty.
+    if length == 1:
+        return str(start + 1)
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+def format_unified_diff(changes: List[Tuple[int, List[str], int, List[str]]], fixed_lines: List[str],
+                        original_length: int, context_lines: int = 3) -> str:
+    """
+    Format changes as a unified diff, merging changes whose context overlaps.
     
-    diff_lines = []
-    diff_lines.append("--- original.yml")
-    diff_lines.append("+++ fixed.yml")
+    Args:
+        changes: Sorted (original start, removed lines, fixed start, added lines) tuples
+        fixed_lines: Lines of the fixed YAML, used for context
+        
+        Lines end with their newline, as returned by _with_newlines; a last
+        line without one is marked "\\ No newline at end of file".
+        original_length: Number of lines of the original YAML
+        context_lines: Number of context lines around each change
+        
+    Returns:
+        Unified diff string
+    """
+    diff_lines = ["--- original.yml", "+++ fixed.yml"]
     
-    # Simple line-by-line comparison
-    max_lines = max(len(lines_original), len(lines_fixed))
     i = 0
-    
-    while i < max_lines:
-        orig_line = lines_original[i] if i < len(lines_original) else None
-        fixed_line = lines_fixed[i] if i < len(lines_fixed) else None
+    while i < len(changes):
+        # Group the changes that are less than two contexts apart into one hunk
+        j = i
+        while j + 1 < len(changes) and \
+                changes[j + 1][0] - (changes[j][0] + len(changes[j][1])) <= 2 * context_lines:
+            j += 1
         
-        if orig_line != fixed_line:
-            # Start a hunk
-            diff_lines.append(f"@@ -{i+1},{context_lines*2+1} +{i+1},{context_lines*2+1} @@")
-            
-            # Add context before
-            for j in range(max(0, i-context_lines), i):
-                if j < len(lines_original):
-                    diff_lines.append(f" {lines_original[j]}")
-            
-            # Add the change
-            if orig_line is not None:
-                diff_lines.append(f"-{orig_line}")
-            if fixed_line is not None:
-                diff_lines.append(f"+{fixed_line}")
-            
-            # Add context after
-            for j in range(i+1, min(len(lines_original), i+context_lines+1)):
-                diff_lines.append(f" {lines_original[j]}")
+        first, last = changes[i], changes[j]
+        original_start = max(0, first[0] - context_lines)
+        fixed_start = first[2] - (first[0] - original_start)
+        original_end = min(original_length, last[0] + len(last[1]) + context_lines)
+        fixed_end = last[2] + len(last[3]) + (original_end - last[0] - len(last[1]))
         
-        i += 1
+        diff_lines.append(
+            f"@@ -{_format_range(original_start, original_end - original_start)} "
+            f"+{_format_range(fixed_start, fixed_end - fixed_start)} @@"
+        )
+        position = fixed_start
+        for original_line, removed, fixed_line, added in changes[i:j + 1]:
+            diff_lines.extend(_diff_line(" ", line) for line in fixed_lines[position:fixed_line])
+            diff_lines.extend(_diff_line("-", line) for line in removed)
+            diff_lines.extend(_diff_line("+", line) for line in added)
+            position = fixed_line + len(added)
+        diff_lines.extend(_diff_line(" ", line) for line in fixed_lines[position:fixed_end])
+        i = j + 1
     
     return '\n'.join(diff_lines)
 
+def unified_diff_from_edits(edits, fixed_lines: List[str], context_lines: int = 3) -> str:
+    """
+    Generate the unified diff of a fix from the edits it recorded.
+    
+    Args:
+        edits: Sorted, non-overlapping edits, in lines of the YAML before the fix
+        fixed_lines: Lines of the YAML after the fix, split on newlines
+        context_lines: Number of context lines to include
+        
+    Returns:
+        Unified diff string, without re-diffing the documents
+    """
+    changes = []
+    offset = 0
+    for edit in edits:
+        if changes and changes[-1][0] + len(changes[-1][1]) == edit.start:
+            # Adjacent edits form one change, removed lines before added ones
+            original_line, removed, fixed_line, added = changes[-1]
+            changes[-1] = (original_line, removed + edit.removed, fixed_line, added + edit.added)
+        else:
+            changes.append((edit.start, edit.removed, edit.start + offset, edit.added))
+        offset += len(edit.added) - len(edit.removed)
+    
+    fixed_length = len(fixed_lines)
+    original_length = fixed_length - offset
+    if changes:
+        original_line, removed, fixed_line, added = changes[-1]
+        if original_line + len(removed) == original_length and original_line > 0 and bool(removed) != bool(added):
+            # Lines only added or only removed at the end: the line before
+            # them gains or loses the final newline, so it changes as well.
+            before = fixed_lines[fixed_line - 1]
+            changes[-1] = (original_line - 1, [before] + removed, fixed_line - 1, [before] + added)
+    
+    terminated = []
+    offset = 0
+    for original_line, removed, fixed_line, added in changes:
+        removed = _with_newlines(removed, original_line, original_length)
+        added = _with_newlines(added, fixed_line, fixed_length)
+        if removed or added:
+            terminated.append((original_line, removed, fixed_line, added))
+        offset += len(added) - len(removed)
+    fixed_lines = _with_newlines(fixed_lines)
+    return format_unified_diff(terminated, fixed_lines, len(fixed_lines) - offset, context_lines)
+
 def add_explanatory_comments(diff: str, vulnerability_type: str) -> str:
     """
     Add explanatory comments to a diff based on vulnerability type.
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .action_pins import PinSet
+from .blobs import DIALECT_INSERTS, blob_hash, load_blobs
+from .fix_engine import FIX_ENGINE_VERSION
+from .models import FixResult, FixSuggestion
+
+# Responses kept in memory, most recently used first; 0 disables the memory tier.
+FIX_CACHE_SIZE = int(os.getenv("FIX_CACHE_SIZE", "256"))
+# Also keep results in the fix_results table, shared by every instance and restart.
+FIX_CACHE_PERSIST = os.getenv("FIX_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+
+
+def fix_cache_key(workflow_yaml: str, vulnerabilities: List[Dict[str, Any]], pins: PinSet) -> str:
+    """Key of a /fix request: its workflow, ordered vulnerability types and lines, and the engine and pins in use."""
+    key = [
+        blob_hash(workflow_yaml),
+        [[vulnerability.get("type"), vulnerability.get("line")] for vulnerability in vulnerabilities],
+        FIX_ENGINE_VERSION,
+        pins.version
+    ]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+class FixResultCache:
+    """Responses of POST /fix, by fix_cache_key.
+
+    A bounded LRU of response dicts sits in front of the fix_results table.
+    Persisted results refer to the fix_suggestions rows and blobs the first
+    request stored, so a hit adds no rows; one whose rows are gone is a miss.
+    """
+
+    def __init__(self, size: int = FIX_CACHE_SIZE, persist: bool = FIX_CACHE_PERSIST):
+        self.size = size
+        self.persist = persist
+        self._entries = OrderedDict()  # key -> response dict
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession, key: str, workflow_yaml: str) -> Optional[Dict[str, Any]]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        elif self.persist:
+            response = await self._load(db, key, workflow_yaml)
+            if response is not None:
+                self.remember(key, response)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def put(self, db: AsyncSession, key: str, response: Dict[str, Any], fixed_hash: str):
+        """Add the persisted result to the session; the caller commits, then calls remember().
+
+        A result already stored under key, e.g. one whose rows were deleted, is replaced.
+        """
+        if not self.persist:
+            return
+        row = {"key": key, "fix_ids": [fix["id"] for fix in response["fixes"]], "fixed_hash": fixed_hash}
+        insert = DIALECT_INSERTS.get(db.bind.dialect.name)
+        if insert is None:
+            await db.merge(FixResult(**row))
+        else:
+            statement = insert(FixResult).values(**row)
+            await db.execute(statement.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"fix_ids": statement.excluded.fix_ids, "fixed_hash": statement.excluded.fixed_hash}
+            ))
+
+    def remember(self, key: str, response: Dict[str, Any]):
+        if self.size <= 0:
+            return
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "size": self.size, "hits": self.hits, "misses": self.misses}
+
+    async def _load(self, db: AsyncSession, key: str, workflow_yaml: str) -> Optional[Dict[str, Any]]:
+        result = await db.get(FixResult, key)
+        if result is None:
+            return None
+        rows = (await db.execute(select(FixSuggestion).where(FixSuggestion.id.in_(result.fix_ids)))).scalars()
+        fixes = {fix.id: fix for fix in rows}
+        if len(fixes) != len(result.fix_ids):
+            return None
+        texts = await load_blobs(db, [result.fixed_hash] + [fix.diff_hash for fix in fixes.values()])
+        if result.fixed_hash not in texts or any(fix.diff_hash not in texts for fix in fixes.values()):
+            return None
+        return {
+            "fixes": [
+                {
+                    "id": fix.id,
+                    "vulnerability_type": fix.vulnerability_type,
+                    "description": fix.description,
+                    "diff": texts[fix.diff_hash],
+                    "severity": fix.severity,
+                    "auto_applicable": fix.auto_applicable == "true"
+                }
+                for fix in (fixes[fix_id] for fix_id in result.fix_ids)
+            ],
+            "original_yaml": workflow_yaml,
+            "fixed_yaml": texts[result.fixed_hash]
+        }
+
+
+fix_cache = FixResultCache()
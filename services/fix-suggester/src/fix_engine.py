@@ -1,13 +1,74 @@
 import yaml
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 import os
+from .action_pins import ActionPins, PinSet, action_pins, parse_uses
+from .workflow_document import WorkflowDocument
+from .diff_generator import unified_diff_from_edits
+
+# Version of the fixes this engine produces, part of the fix cache key; bump it
+# whenever a change to a fixer alters its output
+FIX_ENGINE_VERSION = '1.1.0'
+
+# Patterns to detect potential secrets
+SECRET_PATTERNS = [
+    re.compile(r'password:\s*["\']?[\w]+["\']?', re.IGNORECASE),
+    re.compile(r'token:\s*["\']?[\w]+["\']?', re.IGNORECASE),
+    re.compile(r'api_key:\s*["\']?[\w]+["\']?', re.IGNORECASE),
+    re.compile(r'secret:\s*["\']?[\w]+["\']?', re.IGNORECASE),
+]
+
+# Indentation, optional list dash, and key of a "key: value" line
+KEY_LINE = re.compile(r'^(\s*(?:-\s+)?)([^:#\s][^:#]*?)\s*:')
+
+# Value of a uses: key, without its quotes
+USES_VALUE = re.compile(r'uses:\s*["\']?([^\s"\'#,\]}]+)')
+
+
+def _uses_nodes(node: yaml.Node):
+    """Scalar values of every uses: key in the tree, e.g. job steps and reusable workflows."""
+    if isinstance(node, yaml.MappingNode):
+        for key_node, value_node in node.value:
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value == 'uses' \
+                    and isinstance(value_node, yaml.ScalarNode):
+                yield value_node
+            else:
+                yield from _uses_nodes(value_node)
+    elif isinstance(node, yaml.SequenceNode):
+        for item in node.value:
+            yield from _uses_nodes(item)
+
+
+def _target_line(document: WorkflowDocument, vulnerability: Dict[str, Any]) -> Optional[int]:
+    """Original line of the vulnerability's 1-based line, or None when it has none or it is out of range."""
+    line = vulnerability.get('line')
+    if isinstance(line, int) and 1 <= line <= len(document.original_lines):
+        return line - 1
+    return None
+
+
+def _job_at(jobs: Optional[yaml.Node], line_number: int) -> Optional[Tuple[yaml.Node, yaml.Node]]:
+    """Name and config nodes of the job whose block holds an original line."""
+    if not isinstance(jobs, yaml.MappingNode) or jobs.flow_style:
+        return None
+    job = None
+    for job_name, job_config in jobs.value:
+        if job_name.start_mark.line > line_number:
+            break
+        job = (job_name, job_config)
+    if job is None:
+        return None
+    # A block ends where the next top-level key starts, or at the end of the document
+    end = job[1].end_mark
+    return job if line_number < end.line or (line_number == end.line and end.column > 0) else None
 
 class FixEngine:
     """Engine for generating security fixes for GitHub Actions workflows"""
     
-    def __init__(self):
+    def __init__(self, pins: ActionPins = action_pins):
+        self.pins = pins
+        
         # Setup Jinja2 environment
         template_dir = os.path.join(os.path.dirname(__file__), 'templates')
         self.jinja_env = Environment(
@@ -15,198 +76,282 @@ class FixEngine:
             autoescape=select_autoescape(['yaml', 'yml'])
         )
     
-    def generate_fix(self, workflow_yaml: str, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_fixes(self, workflow_yaml: str, vulnerabilities: List[Dict[str, Any]],
+                       pins: Optional[PinSet] = None) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Apply the fixes for several vulnerabilities, in order, to one parsed workflow.
+        
+        The workflow is parsed once and every fix edits the same document.
+        Each fix's diff is built from the edits it recorded instead of
+        re-diffing the whole document.
+        
+        Args:
+            workflow_yaml: Original workflow YAML content
+            vulnerabilities: Vulnerability details, in the order to fix them
+            pins: Pins to apply, by default those loaded now
+            
+        Returns:
+            Per-fix results (with the YAML after the fix and its diff) and the final YAML
+        """
+        if pins is None:
+            pins = self.pins.snapshot()
+        document = WorkflowDocument(workflow_yaml)
+        results = []
+        current_yaml = workflow_yaml
+        
+        for vulnerability in vulnerabilities:
+            result = self._apply_fix(document, vulnerability, pins)
+            edits = document.commit()
+            if edits:
+                current_yaml = document.text()
+            result['fixed_yaml'] = current_yaml
+            result['diff'] = unified_diff_from_edits(edits, document.lines)
+            results.append(result)
+        
+        return results, current_yaml
+    
+    def generate_fix(self, workflow_yaml: str, vulnerability: Dict[str, Any],
+                     pins: Optional[PinSet] = None) -> Dict[str, Any]:
         """
         Generate a fix for a specific vulnerability.
         
         Args:
             workflow_yaml: Original workflow YAML content
             vulnerability: Vulnerability details
+            pins: Pins to apply, by default those loaded now
             
         Returns:
             Dictionary with fixed_yaml and metadata
         """
+        if pins is None:
+            pins = self.pins.snapshot()
+        document = WorkflowDocument(workflow_yaml)
+        result = self._apply_fix(document, vulnerability, pins)
+        result['fixed_yaml'] = document.text()
+        return result
+    
+    def _apply_fix(self, document: WorkflowDocument, vulnerability: Dict[str, Any], pins: PinSet) -> Dict[str, Any]:
         vuln_type = vulnerability.get('type', '')
         
         if vuln_type == 'unpinned_action':
-            return self.lock_action_versions(workflow_yaml, vulnerability)
+            return self.lock_action_versions(document, vulnerability, pins)
         elif vuln_type == 'excessive_permissions':
-            return self.restrict_permissions(workflow_yaml, vulnerability)
+            return self.restrict_permissions(document, vulnerability)
         elif vuln_type == 'hardcoded_secret':
-            return self.add_secret_encryption(workflow_yaml, vulnerability)
+            return self.add_secret_encryption(document, vulnerability)
         elif vuln_type == 'weak_hardening':
-            return self.improve_hardening(workflow_yaml, vulnerability)
+            return self.improve_hardening(document, vulnerability)
         else:
             return {
-                'fixed_yaml': workflow_yaml,
                 'description': 'Unknown vulnerability type',
                 'severity': 'low',
                 'auto_applicable': False
             }
     
-    def lock_action_versions(self, workflow_yaml: str, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
+    def lock_action_versions(self, document: WorkflowDocument, vulnerability: Dict[str, Any],
+                             pins: PinSet) -> Dict[str, Any]:
         """
         Pin GitHub Actions to specific commit SHAs.
         
+        When the vulnerability gives the line of a uses: value, only that
+        line is changed; otherwise every uses: value in the workflow is.
+        
         Args:
-            workflow_yaml: Original workflow YAML
+            document: Workflow being fixed
             vulnerability: Vulnerability details
+            pins: Pins to apply
             
         Returns:
             Fix details
         """
-        lines = workflow_yaml.split('\n')
-        fixed_lines = []
-        
-        # Common actions with their pinned versions (SHA@version)
-        pinned_versions = {
-            'actions/checkout@main': 'actions/checkout@b4ffde65f46336ab88eb53be808477a3936bae11 # v4.1.1',
-            'actions/checkout@v4': 'actions/checkout@b4ffde65f46336ab88eb53be808477a3936bae11 # v4.1.1',
-            'actions/checkout@v3': 'actions/checkout@f43a0e5ff2bd294095638e18286ca9a3d1956744 # v3.6.0',
-            'actions/setup-node@v3': 'actions/setup-node@64ed1c7eab4cce3362f8c340dee64e5eaeef8f7c # v3.6.0',
-            'actions/setup-node@v4': 'actions/setup-node@60edb5dd545a775178f52524783378180af0d1f8 # v4.0.2',
-            'actions/setup-python@v4': 'actions/setup-python@65d7f2d534ac1bc67fcd62888c5f4f3d2cb2b236 # v4.7.1',
-            'actions/setup-python@v5': 'actions/setup-python@0a5c61591373683505ea898e09a3ea4f39ef2b9c # v5.0.0',
-        }
-        
-        for line in lines:
-            # Check if line contains 'uses:' with unpinned action
-            if 'uses:' in line and '@' in line:
-                for unpinned, pinned in pinned_versions.items():
-                    if unpinned in line:
-                        line = line.replace(unpinned, pinned)
-                        break
-            fixed_lines.append(line)
-        
-        fixed_yaml = '\n'.join(fixed_lines)
+        target = _target_line(document, vulnerability)
+        # Only the reported line is looked at if it holds a uses: value
+        if target is None or not self._pin_uses_line(document, target, pins):
+            if document.root is not None:
+                # Only the lines holding a uses: value are looked at
+                for node in _uses_nodes(document.root):
+                    line_number = node.start_mark.line
+                    if node.end_mark.line != line_number:
+                        continue
+                    line = document.line(line_number)
+                    if line != document.original_lines[line_number]:
+                        continue  # already changed by an earlier fix
+                    start, end = node.start_mark.column, node.end_mark.column
+                    if node.style in ('"', "'"):
+                        start, end = start + 1, end - 1
+                    self._pin_action(document, line_number, line, start, end, pins)
+            else:
+                # Unparseable YAML: look for a uses: value on every line
+                for line_number in range(len(document.original_lines)):
+                    self._pin_uses_line(document, line_number, pins)
         
         return {
-            'fixed_yaml': fixed_yaml,
             'description': 'Pinned GitHub Actions to specific commit SHAs to prevent supply chain attacks',
             'severity': 'high',
             'auto_applicable': True
         }
     
-    def restrict_permissions(self, workflow_yaml: str, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
+    def _pin_uses_line(self, document: WorkflowDocument, line_number: int, pins: PinSet) -> bool:
+        """Pin the action of a uses: value on an original line; False if the line has none."""
+        line = document.original_lines[line_number]
+        match = USES_VALUE.search(line) if 'uses:' in line else None
+        if match and document.line(line_number) == line:  # not already changed by an earlier fix
+            self._pin_action(document, line_number, line, match.start(1), match.end(1), pins)
+        return match is not None
+    
+    def _pin_action(self, document: WorkflowDocument, line_number: int, line: str, start: int, end: int,
+                    pins: PinSet):
+        """Replace the action reference in line[start:end] with its pinned commit, if there is one."""
+        action = parse_uses(line[start:end])
+        pin = pins.lookup(action) if action else None
+        if pin is None:
+            return
+        rest = line[end:]
+        comment = '' if '#' in rest else f' # {pin.version}'
+        document.replace_line(line_number, f"{line[:start]}{action.pinned(pin)}{rest}{comment}")
+    
+    def restrict_permissions(self, document: WorkflowDocument, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
         """
         Add minimal required permissions to workflow.
         
         Args:
-            workflow_yaml: Original workflow YAML
+            document: Workflow being fixed
             vulnerability: Vulnerability details
             
         Returns:
             Fix details
         """
-        try:
-            workflow_dict = yaml.safe_load(workflow_yaml)
-            
-            # Add minimal permissions at workflow level if not present
-            if 'permissions' not in workflow_dict:
-                workflow_dict['permissions'] = {
-                    'contents': 'read',
-                    'pull-requests': 'write'
-                }
-            
-            # Convert back to YAML
-            fixed_yaml = yaml.dump(workflow_dict, default_flow_style=False, sort_keys=False)
-            
-            return {
-                'fixed_yaml': fixed_yaml,
-                'description': 'Added minimal required permissions following the principle of least privilege',
-                'severity': 'medium',
-                'auto_applicable': True
-            }
-        except Exception as e:
+        error = self._mapping_error(document)
+        if error:
             return {
-                'fixed_yaml': workflow_yaml,
-                'description': f'Failed to parse YAML: {str(e)}',
+                'description': f'Failed to parse YAML: {error}',
                 'severity': 'medium',
                 'auto_applicable': False
             }
+        
+        # Add minimal permissions at workflow level if not present
+        if not document.has_top_level_key('permissions'):
+            indent = ' ' * document.indent_unit()
+            document.add_top_level_block('permissions', [
+                'permissions:',
+                f'{indent}contents: read',
+                f'{indent}pull-requests: write'
+            ])
+        
+        return {
+            'description': 'Added minimal required permissions following the principle of least privilege',
+            'severity': 'medium',
+            'auto_applicable': True
+        }
     
-    def add_secret_encryption(self, workflow_yaml: str, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
+    def add_secret_encryption(self, document: WorkflowDocument, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
         """
         Replace hardcoded secrets with GitHub Secrets references.
         
+        When the vulnerability gives the line of the secret, only that line
+        is changed; otherwise every line of the workflow is checked.
+        
         Args:
-            workflow_yaml: Original workflow YAML
+            document: Workflow being fixed
             vulnerability: Vulnerability details
             
         Returns:
             Fix details
         """
-        lines = workflow_yaml.split('\n')
-        fixed_lines = []
-        
-        # Patterns to detect potential secrets
-        secret_patterns = [
-            (r'password:\s*["\']?[\w]+["\']?', 'password: ${{ secrets.PASSWORD }}'),
-            (r'token:\s*["\']?[\w]+["\']?', 'token: ${{ secrets.GITHUB_TOKEN }}'),
-            (r'api_key:\s*["\']?[\w]+["\']?', 'api_key: ${{ secrets.API_KEY }}'),
-            (r'secret:\s*["\']?[\w]+["\']?', 'secret: ${{ secrets.SECRET }}'),
-        ]
-        
-        for line in lines:
-            modified = False
-            for pattern, replacement in secret_patterns:
-                if re.search(pattern, line, re.IGNORECASE) and '${{' not in line:
-                    # Extract the key name
-                    key = line.split(':')[0].strip()
-                    line = f"{key}: ${{{{ secrets.{key.upper()} }}}}"
-                    modified = True
-                    break
-            fixed_lines.append(line)
-        
-        fixed_yaml = '\n'.join(fixed_lines)
+        target = _target_line(document, vulnerability)
+        if target is None or not self._replace_secret(document, target):
+            for line_number in range(len(document.original_lines)):
+                self._replace_secret(document, line_number)
         
         return {
-            'fixed_yaml': fixed_yaml,
             'description': 'Replaced hardcoded secrets with GitHub Secrets references',
             'severity': 'critical',
             'auto_applicable': False  # Requires manual secret setup
         }
     
-    def improve_hardening(self, workflow_yaml: str, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
+    def _replace_secret(self, document: WorkflowDocument, line_number: int) -> bool:
+        """Replace a hardcoded secret on an original line; False if the line has none."""
+        line = document.line(line_number)
+        if '${{' in line or not any(pattern.search(line) for pattern in SECRET_PATTERNS):
+            return False
+        # Extract the key name, keeping the line's indentation
+        match = KEY_LINE.match(line)
+        if match:
+            prefix, key = match.groups()
+            document.replace_line(line_number, f"{prefix}{key}: ${{{{ secrets.{key.upper()} }}}}")
+        return True
+    
+    def improve_hardening(self, document: WorkflowDocument, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
         """
         Add security hardening measures to workflow.
         
+        When the vulnerability gives a line inside a job, only that job gets
+        a timeout; otherwise concurrency control and every job's timeout are
+        added.
+        
         Args:
-            workflow_yaml: Original workflow YAML
+            document: Workflow being fixed
             vulnerability: Vulnerability details
             
         Returns:
             Fix details
         """
-        try:
-            workflow_dict = yaml.safe_load(workflow_yaml)
-            
-            # Add concurrency control if not present
-            if 'concurrency' not in workflow_dict:
-                workflow_dict['concurrency'] = {
-                    'group': '${{ github.workflow }}-${{ github.ref }}',
-                    'cancel-in-progress': True
-                }
-            
-            # Add timeouts to jobs if not present
-            if 'jobs' in workflow_dict:
-                for job_name, job_config in workflow_dict['jobs'].items():
-                    if isinstance(job_config, dict) and 'timeout-minutes' not in job_config:
-                        job_config['timeout-minutes'] = 30
-            
-            # Convert back to YAML
-            fixed_yaml = yaml.dump(workflow_dict, default_flow_style=False, sort_keys=False)
-            
+        error = self._mapping_error(document)
+        if error:
             return {
-                'fixed_yaml': fixed_yaml,
-                'description': 'Added security hardening: concurrency control and job timeouts',
+                'description': f'Failed to parse YAML: {error}',
                 'severity': 'low',
-                'auto_applicable': True
+                'auto_applicable': False
             }
-        except Exception as e:
+        
+        jobs = document.top_level_value('jobs')
+        target = _target_line(document, vulnerability)
+        job = _job_at(jobs, target) if target is not None else None
+        if job is not None:
+            job_name, job_config = job
+            self._add_job_timeout(document, job_name, job_config)
             return {
-                'fixed_yaml': workflow_yaml,
-                'description': f'Failed to parse YAML: {str(e)}',
+                'description': f'Added security hardening: timeout for job {job_name.value}',
                 'severity': 'low',
-                'auto_applicable': False
+                'auto_applicable': True
             }
+        
+        indent = ' ' * document.indent_unit()
+        
+        # Add concurrency control if not present
+        if not document.has_top_level_key('concurrency'):
+            document.add_top_level_block('concurrency', [
+                'concurrency:',
+                f"{indent}group: ${{{{ github.workflow }}}}-${{{{ github.ref }}}}",
+                f'{indent}cancel-in-progress: true'
+            ])
+        
+        # Add timeouts to jobs if not present
+        if isinstance(jobs, yaml.MappingNode):
+            for job_name, job_config in jobs.value:
+                self._add_job_timeout(document, job_name, job_config)
+        
+        return {
+            'description': 'Added security hardening: concurrency control and job timeouts',
+            'severity': 'low',
+            'auto_applicable': True
+        }
+    
+    def _add_job_timeout(self, document: WorkflowDocument, job_name: yaml.Node, job_config: yaml.Node):
+        if not isinstance(job_config, yaml.MappingNode) or job_config.flow_style or not job_config.value:
+            return
+        if any(key.value == 'timeout-minutes' for key, _ in job_config.value if isinstance(key, yaml.ScalarNode)):
+            return
+        if ('timeout-minutes', job_name.start_mark.line) in document.added_keys:
+            return
+        first_key = job_config.value[0][0]
+        document.insert_lines(first_key.start_mark.line,
+                              [f"{' ' * first_key.start_mark.column}timeout-minutes: 30"])
+        document.added_keys.add(('timeout-minutes', job_name.start_mark.line))
+    
+    def _mapping_error(self, document: WorkflowDocument):
+        if document.error is not None:
+            return str(document.error)
+        if not isinstance(document.root, yaml.MappingNode):
+            return 'workflow is not a mapping'
+        return None
@@ -1,14 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from .routes import router
-from .database import engine, Base
+from .database import database
+from .migrations import upgrade_schema
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create DB tables once the database is reachable, then upgrade older ones
+    await database.connect()
+    async with database.async_engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    yield
+    await database.dispose()
 
 app = FastAPI(
     title="FixSuggester Service",
     description="Generate YAML patches to fix GitHub Actions security vulnerabilities",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(router)
@@ -0,0 +1,50 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from .models import FixSuggestion
+
+# Columns added to fix_suggestions since the first schema, with their DDL
+ADDED_COLUMNS = {
+    "original_hash": "VARCHAR(64) REFERENCES blobs(hash)",
+    "fixed_hash": "VARCHAR(64) REFERENCES blobs(hash)",
+    "diff_hash": "VARCHAR(64) REFERENCES blobs(hash)",
+}
+# Columns that were NOT NULL before their text moved to the blobs table
+LEGACY_TEXT_COLUMNS = ("original_yaml", "fixed_yaml", "diff")
+
+
+def upgrade_schema(conn: Connection):
+    """Bring tables created by earlier versions up to the current models.
+
+    create_all only creates missing tables, so columns added to existing
+    ones are added here. Every step checks the current schema first, so
+    running it on an up-to-date database does nothing.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table("fix_suggestions"):
+        return
+    columns = {column["name"]: column for column in inspector.get_columns("fix_suggestions")}
+
+    for name, ddl in ADDED_COLUMNS.items():
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE fix_suggestions ADD COLUMN {name} {ddl}"))
+
+    not_null = [name for name in LEGACY_TEXT_COLUMNS if name in columns and not columns[name]["nullable"]]
+    if not not_null:
+        return
+    if conn.dialect.name == "sqlite":
+        _rebuild_sqlite_table(conn, inspector)
+    else:
+        for name in not_null:
+            conn.execute(text(f"ALTER TABLE fix_suggestions ALTER COLUMN {name} DROP NOT NULL"))
+
+
+def _rebuild_sqlite_table(conn: Connection, inspector):
+    # SQLite cannot drop a NOT NULL constraint, so the table is recreated from the model and its rows copied.
+    for index in inspector.get_indexes("fix_suggestions"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    conn.execute(text("ALTER TABLE fix_suggestions RENAME TO fix_suggestions_old"))
+    FixSuggestion.__table__.create(conn)
+    columns = ", ".join(column.name for column in FixSuggestion.__table__.columns)
+    conn.execute(text(f"INSERT INTO fix_suggestions ({columns}) SELECT {columns} FROM fix_suggestions_old"))
+    conn.execute(text("DROP TABLE fix_suggestions_old"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, ForeignKey, JSON, Enum as SQLEnum
 from datetime import datetime
 import enum
 from .database import Base
@@ -15,14 +15,27 @@ class VulnerabilityType(str, enum.Enum):
     HARDCODED_SECRET = "hardcoded_secret"
     WEAK_HARDENING = "weak_hardening"
 
+class Blob(Base):
+    # Workflow and diff text, stored once per distinct content and keyed by its SHA-256.
+    __tablename__ = "blobs"
+
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    compression = Column(String(10))  # None when stored as plain UTF-8
+    size = Column(Integer, nullable=False)  # length of the text in bytes
+
 class FixSuggestion(Base):
     __tablename__ = "fix_suggestions"
 
     id = Column(Integer, primary_key=True, index=True)
     vulnerability_type = Column(String(100), nullable=False)
-    original_yaml = Column(Text, nullable=False)
-    fixed_yaml = Column(Text, nullable=False)
-    diff = Column(Text, nullable=False)
+    original_hash = Column(String(64), ForeignKey("blobs.hash"))
+    fixed_hash = Column(String(64), ForeignKey("blobs.hash"))
+    diff_hash = Column(String(64), ForeignKey("blobs.hash"))
+    # Legacy rows only; the text of newer rows lives in the blobs table
+    original_yaml = Column(Text)
+    fixed_yaml = Column(Text)
+    diff = Column(Text)
     description = Column(Text)
     severity = Column(String(20), nullable=False)
     auto_applicable = Column(String(10), default="true")
@@ -30,3 +43,12 @@ class FixSuggestion(Base):
 
     def __repr__(self):
         return f"<FixSuggestion(id={self.id}, type={self.vulnerability_type}, severity={self.severity})>"
+
+class FixResult(Base):
+    # Result of a POST /fix, keyed by its workflow, vulnerabilities and engine version.
+    __tablename__ = "fix_results"
+
+    key = Column(String(64), primary_key=True)
+    fix_ids = Column(JSON, nullable=False)  # fix_suggestions rows, in response order
+    fixed_hash = Column(String(64), ForeignKey("blobs.hash"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
-from .database import get_db
+from .database import get_async_db
 from .models import FixSuggestion
+from .blobs import load_blobs, store_blobs
+from .fix_cache import fix_cache, fix_cache_key
 from .fix_engine import FixEngine
-from .diff_generator import generate_unified_diff, add_explanatory_comments
+from .action_pins import action_pins
+from .diff_generator import add_explanatory_comments
 
 router = APIRouter()
 fix_engine = FixEngine()
@@ -32,9 +36,10 @@ class FixesResponse(BaseModel):
     fixes: List[FixResponse]
     original_yaml: str
     fixed_yaml: str
+    cache_hit: bool = Field(False, description="Whether this response was returned from the fix result cache")
 
 @router.post("/fix", response_model=FixesResponse)
-async def generate_fixes(request: FixRequest, db: Session = Depends(get_db)):
+async def generate_fixes(request: FixRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Generate fix suggestions for detected vulnerabilities.
     
@@ -46,56 +51,72 @@ async def generate_fixes(request: FixRequest, db: Session = Depends(get_db)):
         Fix suggestions with diffs
     """
     try:
-        fixes = []
-        current_yaml = request.workflow_yaml
+        vulnerabilities = [vulnerability.dict() for vulnerability in request.vulnerabilities]
         
-        for vulnerability in request.vulnerabilities:
-            # Generate fix for this vulnerability
-            fix_result = fix_engine.generate_fix(current_yaml, vulnerability.dict())
-            fixed_yaml = fix_result['fixed_yaml']
-            
-            # Generate diff
-            diff = generate_unified_diff(current_yaml, fixed_yaml)
-            diff_with_comments = add_explanatory_comments(diff, vulnerability.type)
-            
-            # Save to database
-            fix_suggestion = FixSuggestion(
+        # The same workflow and vulnerabilities get the stored response of the first request
+        # Fixes are computed with the pins the key names, even if they are reloaded meanwhile
+        action_pins.refresh()
+        pins = action_pins.snapshot()
+        cache_key = fix_cache_key(request.workflow_yaml, vulnerabilities, pins)
+        cached = await fix_cache.get(db, cache_key, request.workflow_yaml)
+        if cached is not None:
+            return FixesResponse(**cached, cache_hit=True)
+        
+        # Parse once and apply every fix to the same document
+        fix_results, fixed_yaml = fix_engine.generate_fixes(request.workflow_yaml, vulnerabilities, pins)
+        diffs = [
+            add_explanatory_comments(fix_result['diff'], vulnerability.type)
+            for vulnerability, fix_result in zip(request.vulnerabilities, fix_results)
+        ]
+        
+        # Each fix starts from the previous one's result; every distinct text is stored once
+        yamls = [request.workflow_yaml] + [fix_result['fixed_yaml'] for fix_result in fix_results]
+        hashes = await store_blobs(db, yamls + diffs)
+        yaml_hashes, diff_hashes = hashes[:len(yamls)], hashes[len(yamls):]
+        
+        fix_suggestions = [
+            FixSuggestion(
                 vulnerability_type=vulnerability.type,
-                original_yaml=current_yaml,
-                fixed_yaml=fixed_yaml,
-                diff=diff_with_comments,
+                original_hash=yaml_hashes[i],
+                fixed_hash=yaml_hashes[i + 1],
+                diff_hash=diff_hashes[i],
                 description=fix_result['description'],
                 severity=fix_result['severity'],
                 auto_applicable=str(fix_result['auto_applicable']).lower()
             )
-            db.add(fix_suggestion)
-            db.commit()
-            db.refresh(fix_suggestion)
-            
-            # Add to response
-            fixes.append(FixResponse(
+            for i, (vulnerability, fix_result) in enumerate(zip(request.vulnerabilities, fix_results))
+        ]
+        db.add_all(fix_suggestions)
+        await db.flush()
+        
+        fixes = [
+            FixResponse(
                 id=fix_suggestion.id,
                 vulnerability_type=fix_suggestion.vulnerability_type,
                 description=fix_suggestion.description,
-                diff=diff_with_comments,
+                diff=diff,
                 severity=fix_suggestion.severity,
                 auto_applicable=fix_suggestion.auto_applicable == "true"
-            ))
-            
-            # Update current YAML for next fix
-            current_yaml = fixed_yaml
+            )
+            for fix_suggestion, diff in zip(fix_suggestions, diffs)
+        ]
         
-        return FixesResponse(
+        response = FixesResponse(
             fixes=fixes,
             original_yaml=request.workflow_yaml,
-            fixed_yaml=current_yaml
+            fixed_yaml=fixed_yaml
         )
+        cached = response.dict(exclude={'cache_hit'})
+        await fix_cache.put(db, cache_key, cached, yaml_hashes[-1])
+        await db.commit()
+        fix_cache.remember(cache_key, cached)
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating fixes: {str(e)}")
 
 @router.get("/fixes")
-async def get_all_fixes(db: Session = Depends(get_db)):
+async def get_all_fixes(db: AsyncSession = Depends(get_async_db)):
     """
     Get all stored fix suggestions.
     
@@ -105,7 +126,7 @@ async def get_all_fixes(db: Session = Depends(get_db)):
     Returns:
         List of all fix suggestions
     """
-    fixes = db.query(FixSuggestion).all()
+    fixes = (await db.execute(select(FixSuggestion))).scalars().all()
     return [
         {
             "id": fix.id,
@@ -118,7 +139,7 @@ async def get_all_fixes(db: Session = Depends(get_db)):
     ]
 
 @router.get("/fixes/{fix_id}")
-async def get_fix_by_id(fix_id: int, db: Session = Depends(get_db)):
+async def get_fix_by_id(fix_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get a specific fix suggestion by ID.
     
@@ -129,18 +150,37 @@ async def get_fix_by_id(fix_id: int, db: Session = Depends(get_db)):
     Returns:
         Fix suggestion details
     """
-    fix = db.query(FixSuggestion).filter(FixSuggestion.id == fix_id).first()
+    fix = await db.get(FixSuggestion, fix_id)
     if not fix:
         raise HTTPException(status_code=404, detail="Fix suggestion not found")
     
+    # Rows written before the blobs table keep their text inline
+    texts = await load_blobs(db, (fix.original_hash, fix.fixed_hash, fix.diff_hash))
     return {
         "id": fix.id,
         "vulnerability_type": fix.vulnerability_type,
         "description": fix.description,
-        "original_yaml": fix.original_yaml,
-        "fixed_yaml": fix.fixed_yaml,
-        "diff": fix.diff,
+        "original_yaml": texts.get(fix.original_hash, fix.original_yaml),
+        "fixed_yaml": texts.get(fix.fixed_hash, fix.fixed_yaml),
+        "diff": texts.get(fix.diff_hash, fix.diff),
         "severity": fix.severity,
         "auto_applicable": fix.auto_applicable == "true",
         "timestamp": fix.timestamp.isoformat()
     }
+
+@router.get("/admin/pins")
+def get_pins_status():
+    return {"path": action_pins.path, "pins": len(action_pins)}
+
+@router.get("/admin/cache")
+def get_cache_status():
+    return fix_cache.stats()
+
+@router.post("/admin/pins/reload")
+def reload_pins():
+    """Reload the action pin database; fixes already running finish on the old pins."""
+    try:
+        pins = action_pins.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Action pin reload failed: {str(e)}")
+    return {"path": action_pins.path, "pins": pins}
@@ -0,0 +1,129 @@
+import yaml
+from bisect import bisect_right
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+
+class Edit(NamedTuple):
+    """Lines of the document before a fix, from start, replaced by added."""
+    start: int
+    removed: List[str]
+    added: List[str]
+
+
+class WorkflowDocument:
+    """A workflow's text lines plus its YAML node tree, parsed once.
+
+    The tree is composed from the original text and its nodes keep their
+    original line numbers. Fixers edit lines through replace_line and
+    insert_lines, addressed by original line, so the tree stays valid while
+    lines are inserted and every byte outside the edited lines is preserved.
+    The edits of each fix are recorded until commit() hands them over.
+    """
+
+    def __init__(self, workflow_yaml: str):
+        self.original_lines = workflow_yaml.split('\n')
+        self.lines = list(self.original_lines)
+        self.added_keys = set()  # top-level keys inserted by fixes
+        self._inserts = ([], [])  # original lines with lines inserted before them, and cumulated counts
+        self._fix_inserts = self._inserts  # the same, as of the start of the current fix
+        self._pending = []  # (original line, kind, removed, added) recorded by the current fix
+        try:
+            self.root = yaml.compose(workflow_yaml, Loader=yaml.SafeLoader)
+            self.error = None
+        except yaml.YAMLError as e:
+            self.root = None
+            self.error = e
+
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+    @staticmethod
+    def _position(original_line: int, inserts: Tuple[List[int], List[int]]) -> int:
+        positions, totals = inserts
+        i = bisect_right(positions, original_line)
+        return original_line + (totals[i - 1] if i else 0)
+
+    def index(self, original_line: int) -> int:
+        """Current index of an original line; lines inserted before it come first."""
+        return self._position(original_line, self._inserts)
+
+    def line(self, original_line: int) -> str:
+        return self.lines[self.index(original_line)]
+
+    def end_line(self) -> int:
+        """Original line before which text is appended to the document."""
+        if len(self.original_lines) > 1 and self.original_lines[-1] == '':
+            return len(self.original_lines) - 1  # keep the final newline last
+        return len(self.original_lines)
+
+    def replace_line(self, original_line: int, text: str):
+        index = self.index(original_line)
+        self._pending.append((original_line, 1, [self.lines[index]], [text]))
+        self.lines[index] = text
+
+    def insert_lines(self, original_line: int, new_lines: List[str]):
+        """Insert new_lines before an original line, after anything inserted there earlier."""
+        index = self.index(original_line)
+        self.lines[index:index] = new_lines
+        self._pending.append((original_line, 0, [], list(new_lines)))
+
+        positions, totals = list(self._inserts[0]), list(self._inserts[1])
+        i = bisect_right(positions, original_line)
+        if not i or positions[i - 1] != original_line:
+            positions.insert(i, original_line)
+            totals.insert(i, totals[i - 1] if i else 0)
+            i += 1
+        totals[i - 1:] = [total + len(new_lines) for total in totals[i - 1:]]
+        self._inserts = (positions, totals)
+
+    def commit(self) -> List[Edit]:
+        """Edits of the current fix, in lines of the document before it, and start the next fix."""
+        edits = []
+        # Lines inserted before an original line sort ahead of changes to the line itself.
+        for original_line, kind, removed, added in sorted(self._pending, key=lambda edit: edit[:2]):
+            start = self._position(original_line, self._fix_inserts)
+            if edits and edits[-1].start == start:
+                previous = edits[-1]
+                if previous.removed and removed:
+                    edits[-1] = Edit(start, previous.removed, added)  # the same line replaced again
+                else:
+                    edits[-1] = Edit(start, previous.removed or removed, previous.added + added)
+            else:
+                edits.append(Edit(start, removed, added))
+        self._pending = []
+        self._fix_inserts = self._inserts
+        return edits
+
+    def top_level(self) -> Iterator[Tuple[yaml.Node, yaml.Node]]:
+        if isinstance(self.root, yaml.MappingNode):
+            yield from self.root.value
+
+    def has_top_level_key(self, key: str) -> bool:
+        return key in self.added_keys or any(
+            isinstance(key_node, yaml.ScalarNode) and key_node.value == key for key_node, _ in self.top_level()
+        )
+
+    def top_level_value(self, key: str) -> Optional[yaml.Node]:
+        for key_node, value_node in self.top_level():
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value == key:
+                return value_node
+        return None
+
+    def indent_unit(self) -> int:
+        """Indentation the document uses for nested mappings, 2 by default."""
+        for _, value_node in self.top_level():
+            if isinstance(value_node, yaml.MappingNode) and not value_node.flow_style and value_node.value:
+                column = value_node.value[0][0].start_mark.column
+                if column > 0:
+                    return column
+        return 2
+
+    def add_top_level_block(self, key: str, block: List[str], before: str = 'jobs'):
+        """Insert a top-level key with its block before the key named before, or at the end."""
+        line = self.end_line()
+        for key_node, _ in self.top_level():
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value == before:
+                line = key_node.start_mark.line
+                break
+        self.insert_lines(line, block)
+        self.added_keys.add(key)
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Tests run against a throwaway SQLite database, set before any test imports src
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'fixsuggester.db')}"
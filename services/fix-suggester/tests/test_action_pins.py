@@ -0,0 +1,37 @@
+import json
+
+from src.action_pins import ActionPins
+from src.fix_cache import fix_cache_key
+from src.fix_engine import FixEngine
+
+OLD_SHA = "a" * 40
+NEW_SHA = "b" * 40
+WORKFLOW = """on: push
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+"""
+VULNERABILITIES = [{"type": "unpinned_action", "line": 6}]
+
+
+def test_fixes_use_the_pins_their_cache_key_names(tmp_path):
+    path = tmp_path / "action_pins.json"
+    path.write_text(json.dumps({"actions/checkout@v4": f"{OLD_SHA} # v4.1.0"}))
+    pins = ActionPins(str(path))
+    engine = FixEngine(pins)
+    snapshot = pins.snapshot()
+    key = fix_cache_key(WORKFLOW, VULNERABILITIES, snapshot)
+
+    # The pin file changes after the key was computed
+    path.write_text(json.dumps({"actions/checkout@v4": f"{NEW_SHA} # v4.2.0", "actions/cache@v4": f"{NEW_SHA} # v4"}))
+    _, fixed_yaml = engine.generate_fixes(WORKFLOW, VULNERABILITIES, snapshot)
+    assert f"actions/checkout@{OLD_SHA} # v4.1.0" in fixed_yaml
+    assert pins.version == snapshot.version  # the engine does not reload the pins itself
+
+    pins.refresh()
+    assert fix_cache_key(WORKFLOW, VULNERABILITIES, pins.snapshot()) != key
+    assert len(snapshot) == 1 and len(pins) == 2
+    _, fixed_yaml = engine.generate_fixes(WORKFLOW, VULNERABILITIES)
+    assert f"actions/checkout@{NEW_SHA} # v4.2.0" in fixed_yaml
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+DB_PATH = os.environ["DATABASE_URL"][len("sqlite:///"):]  # set by conftest.py
+
+# fix_suggestions as created by the first version of the service
+BASELINE_SCHEMA = """
+CREATE TABLE fix_suggestions (
+    id INTEGER NOT NULL PRIMARY KEY,
+    vulnerability_type VARCHAR(100) NOT NULL,
+    original_yaml TEXT NOT NULL,
+    fixed_yaml TEXT NOT NULL,
+    diff TEXT NOT NULL,
+    description TEXT,
+    severity VARCHAR(20) NOT NULL,
+    auto_applicable VARCHAR(10),
+    timestamp DATETIME
+);
+CREATE INDEX ix_fix_suggestions_id ON fix_suggestions (id);
+INSERT INTO fix_suggestions (vulnerability_type, original_yaml, fixed_yaml, diff, description, severity,
+                             auto_applicable, timestamp)
+VALUES ('weak_hardening', 'on: push', 'on: push\nconcurrency: x', '+concurrency: x', 'legacy', 'low', 'true',
+        '2024-01-01 00:00:00');
+"""
+
+WORKFLOW = """name: CI
+on: push
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+"""
+
+
+def test_baseline_database_is_upgraded():
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+
+    for _ in range(2):  # the upgrade runs again on every start
+        with TestClient(app) as client:
+            legacy = client.get("/fixes/1")
+            assert legacy.status_code == 200
+            assert legacy.json()["original_yaml"] == "on: push"
+            assert legacy.json()["diff"] == "+concurrency: x"
+
+            response = client.post("/fix", json={
+                "workflow_yaml": WORKFLOW,
+                "vulnerabilities": [{"type": "unpinned_action"}, {"type": "weak_hardening"}]
+            })
+            assert response.status_code == 200, response.text
+            body = response.json()
+            for fix in body["fixes"]:
+                stored = client.get(f"/fixes/{fix['id']}").json()
+                assert stored["diff"] == fix["diff"]
+            assert client.get(f"/fixes/{body['fixes'][-1]['id']}").json()["fixed_yaml"] == body["fixed_yaml"]
+
+    conn = sqlite3.connect(DB_PATH)
+    columns = {row[1]: row for row in conn.execute("PRAGMA table_info(fix_suggestions)")}
+    conn.close()
+    assert {"original_hash", "fixed_hash", "diff_hash"} <= set(columns)
+    assert not any(columns[name][3] for name in ("original_yaml", "fixed_yaml", "diff"))  # notnull flag
@@ -0,0 +1,161 @@
+"""Benchmark LogParserEngine.parse on synthetic CI logs.
+
+Run from services/log-parser:
+
+    python -m benchmarks.bench_parser --sizes 1KB,1MB,16MB --output results.json
+    python -m benchmarks.bench_parser --compare baseline.json results.json
+
+Every case reports throughput (MB/s, best of --repeat runs), peak traced
+memory of one extra run under tracemalloc, and the match count per
+category. Results are written as JSON so runs of different versions can
+be compared.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.parser_engine import LogParserEngine
+
+from .corpus import DENSITIES, PATHOLOGICAL, generate, pathological
+
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+DEFAULT_SIZES = "1KB,64KB,1MB,16MB"
+FULL_SIZES = "1KB,64KB,1MB,16MB,128MB,500MB"
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_case(engine: LogParserEngine, content: str, repeat: int, memory: bool) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = engine.parse(content)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        engine.parse(content)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    megabytes = len(content) / UNITS["MB"]
+    return {
+        "seconds": round(best, 6),
+        "mb_per_s": round(megabytes / best, 3) if best else None,
+        "peak_memory_bytes": peak,
+        "matches": {category: len(findings) for category, findings in result.items()},
+    }
+
+
+def run(args) -> dict:
+    # Time the serial scanner; the parallel mode is benchmarked by raising --workers.
+    engine = LogParserEngine(workers=args.workers)
+    cases = []
+    for size_text in args.sizes.split(","):
+        size = parse_size(size_text)
+        profiles = [(f"density:{name}", lambda size, name=name: generate(size, name, args.seed))
+                    for name in args.densities.split(",")]
+        if args.pathological:
+            profiles += [(f"pathological:{name}", lambda size, name=name: pathological(name, size))
+                         for name in PATHOLOGICAL]
+        for label, make in profiles:
+            content = make(size)
+            case = {"size": size, "corpus": label}
+            case.update(run_case(engine, content, args.repeat, not args.no_memory))
+            cases.append(case)
+            print(f"{size_text:>7} {label:<30} {case['mb_per_s']:>10} MB/s  "
+                  f"peak={case['peak_memory_bytes']}  matches={case['matches']}", file=sys.stderr)
+    engine.close()
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pattern_version": engine.pattern_version,
+        "workers": args.workers,
+        "seed": args.seed,
+        "cases": cases,
+    }
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    """Print per-case throughput changes; return 1 if any case regressed."""
+    with open(baseline_path) as f:
+        baseline = {(c["size"], c["corpus"]): c for c in json.load(f)["cases"]}
+    with open(current_path) as f:
+        current = json.load(f)["cases"]
+
+    regressed = False
+    for case in current:
+        before = baseline.get((case["size"], case["corpus"]))
+        if not before or not before["mb_per_s"] or not case["mb_per_s"]:
+            continue
+        change = case["mb_per_s"] / before["mb_per_s"] - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        if before["matches"] != case["matches"]:
+            flag += "  MATCHES DIFFER"
+            regressed = True
+        print(f"{case['size']:>12} {case['corpus']:<30} {before['mb_per_s']:>10} -> {case['mb_per_s']:>10} MB/s "
+              f"({change:+.1%}){flag}")
+    return 1 if regressed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--full", action="store_true", help=f"use sizes {FULL_SIZES}")
+    parser.add_argument("--densities", default=",".join(DENSITIES), help="comma-separated density profiles")
+    parser.add_argument("--no-pathological", dest="pathological", action="store_false",
+                        help="skip the regex worst-case corpora")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case; the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--workers", type=int, default=1, help="LogParserEngine workers (1 = serial)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="throughput drop reported as a regression by --compare (default 0.1)")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    if args.full:
+        args.sizes = FULL_SIZES
+    results = run(args)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Deterministic synthetic CI logs for benchmarking LogParserEngine.
+
+The same (size, profile, seed) always produces the same text, so results
+from different versions of the parser are comparable.
+"""
+import random
+
+# Per-line probabilities of planting a secret, an error and a URL.
+DENSITIES = {
+    "clean": (0.0, 0.0, 0.0),
+    "sparse": (0.0005, 0.005, 0.005),
+    "typical": (0.002, 0.03, 0.02),
+    "failing": (0.002, 0.5, 0.02),
+    "dense": (0.05, 0.8, 0.3),
+    # Typical densities, with the non-ASCII status marks, emoji and
+    # localized words of real CI output mixed into the lines.
+    "unicode": (0.002, 0.03, 0.02),
+}
+
+STEPS = ["Checkout", "Setup node", "Install dependencies", "Lint", "Build", "Run tests", "Upload artifact", "Deploy"]
+WORDS = [
+    "added", "packages", "from", "contributors", "audited", "compiling", "module", "webpack", "bundle",
+    "passed", "skipped", "suite", "cache", "restored", "saved", "layer", "pulling", "digest", "done",
+    "warning", "deprecated", "resolved", "linking", "took", "ms", "ok", "node_modules", "src", "dist",
+]
+UNICODE_WORDS = ["✓", "✗", "→", "…", "🚀", "⚠️", "données", "größe", "terminé", "日志", "сборка"]
+SECRETS = [
+    "export AWS_ACCESS_KEY_ID=AKIA{caps16}",
+    "GITHUB_TOKEN=ghp_{alnum36}",
+    "DB_PASSWORD={alnum12}",
+    "api_key: '{alnum16}'",
+]
+ERRORS = [
+    "Error: Cannot find module '{word}'",
+    "npm ERR! code E{num}",
+    "FAILED tests/test_{word}.py::test_{word}",
+    "java.lang.NullPointerException at {word}",
+    "fatal: unable to access repository",
+]
+URLS = [
+    "Downloading https://registry.npmjs.org/{word}/-/{word}-{num}.tgz",
+    "See http://ci.example.com/job/{num}/console",
+]
+
+UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+ALNUM = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+def _fill(rng: random.Random, template: str) -> str:
+    return template.format(
+        caps16="".join(rng.choices(UPPER, k=16)),
+        alnum36="".join(rng.choices(ALNUM, k=36)),
+        alnum16="".join(rng.choices(ALNUM, k=16)),
+        alnum12="".join(rng.choices(ALNUM, k=12)),
+        word=rng.choice(WORDS),
+        num=rng.randint(100, 99999),
+    )
+
+
+def generate(size: int, profile: str = "typical", seed: int = 0) -> str:
+    """Return a CI-style log of exactly ``size`` characters."""
+    secret_p, error_p, url_p = DENSITIES[profile]
+    words = WORDS + UNICODE_WORDS if profile == "unicode" else WORDS
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    second = 0
+    while length < size:
+        second += rng.randint(0, 2)
+        parts = [f"2024-01-01T{second // 3600 % 24:02d}:{second // 60 % 60:02d}:{second % 60:02d}.000Z",
+                 f"[{rng.choice(STEPS)}]"]
+        parts.extend(rng.choices(words, k=rng.randint(3, 12)))
+        if secret_p and rng.random() < secret_p:
+            parts.append(_fill(rng, rng.choice(SECRETS)))
+        if error_p and rng.random() < error_p:
+            parts.append(_fill(rng, rng.choice(ERRORS)))
+        if url_p and rng.random() < url_p:
+            parts.append(_fill(rng, rng.choice(URLS)))
+        line = " ".join(parts)
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+# Inputs aimed at the worst cases of the patterns and of the prefilter.
+PATHOLOGICAL = {
+    # One URL without any whitespace: a single match as long as the log.
+    "long-token": lambda size: _repeat("https://" + "a" * 1024, size),
+    # Secret keywords followed by long whitespace runs and no value, so the
+    # \s* of the secret pattern backtracks at every keyword.
+    "whitespace-runs": lambda size: _repeat("password" + " " * 512 + "\n", size),
+    # Anchors everywhere that never complete a match.
+    "anchor-flood": lambda size: _repeat("keyAKIAghp_http", size),
+    # Every few characters is a match.
+    "match-flood": lambda size: _repeat("error fail ", size),
+    # Non-ASCII text with a character that re.IGNORECASE folds to an ASCII
+    # letter and whose lower-casing changes length, which the prefilter
+    # maps to ASCII before lower-casing.
+    "unicode-casefold": lambda size: _repeat("İstanbul build ok token ", size),
+}
+
+
+def pathological(name: str, size: int) -> str:
+    return PATHOLOGICAL[name](size)
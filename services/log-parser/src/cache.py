@@ -0,0 +1,59 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+CACHE_MAX_BYTES = int(os.getenv("LOG_PARSER_CACHE_BYTES", 64 * 1024 * 1024))
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _result_size(result: dict) -> int:
+    # Rough footprint: the matched text dominates, plus per-finding overhead.
+    size = 256
+    analysis = result.get("analysis", {})
+    mode = result.get("analysis_mode", "records")
+    if mode == "compact":
+        for columns in analysis["findings"].values():
+            size += 32 * len(columns["start"])
+        return size
+    for findings in analysis.values():
+        if mode != "records":
+            findings = findings["first"] + findings["last"] + findings["sample"]
+        size += sum(64 + len(finding["match"]) for finding in findings)
+    return size
+
+
+class ParseResultCache:
+    """In-process LRU of parse results (analysis, finding types and mode)
+    keyed by (content hash, pattern version, analysis mode).
+
+    Entries are evicted least recently used first once their estimated
+    total size exceeds ``max_bytes``; a single result larger than the
+    bound is not cached at all.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (result, size)
+        self._size = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, result: dict):
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (result, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= evicted
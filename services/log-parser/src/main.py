@@ -1,22 +1,50 @@
 from fastapi import FastAPI
-from .routes import router
+from .routes import router, engine
 
 app = FastAPI(title="SafeOps LogParser")
 
 app.include_router(router, prefix="/logs")
 
 import os
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+
+# Metadata fields GET /logs is often filtered on, e.g. "jobId,source".
+METADATA_INDEXES = [key for key in os.getenv("LOG_PARSER_METADATA_INDEXES", "").split(",") if key]
+# Parsed logs older than this are expired by MongoDB; unset keeps them forever.
+TTL_DAYS = os.getenv("LOG_PARSER_TTL_DAYS")
+
+async def create_indexes(collection):
+    # Lets re-uploaded logs be served from a stored analysis (see cache.py).
+    await collection.create_index([("content_hash", 1), ("pattern_version", 1)])
+    # Keyset pagination and filters of GET /logs.
+    await collection.create_index([("timestamp", -1), ("_id", -1)])
+    await collection.create_index([("finding_types", 1), ("timestamp", -1)])
+    for key in METADATA_INDEXES:
+        await collection.create_index([(f"metadata.{key}", 1), ("timestamp", -1)])
+
+    if TTL_DAYS:
+        expire_after = int(float(TTL_DAYS) * 86400)
+        try:
+            await collection.create_index("timestamp", expireAfterSeconds=expire_after)
+        except OperationFailure:
+            # The TTL index exists with another expiry; update it in place.
+            await collection.database.command(
+                "collMod", collection.name,
+                index={"keyPattern": {"timestamp": 1}, "expireAfterSeconds": expire_after}
+            )
 
 @app.on_event("startup")
 async def startup_db_client():
-    app.mongodb_client = MongoClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    app.mongodb_client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
     app.database = app.mongodb_client["safeops-logminer"]
+    await create_indexes(app.database["parsed_logs"])
     print("Connected to MongoDB")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     app.mongodb_client.close()
+    engine.close()
 
 @app.get("/")
 async def root():
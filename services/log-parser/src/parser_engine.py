@@ -1,50 +1,728 @@
+import hashlib
+import json
+import heapq
+import os
+import random
 import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Characters of look-ahead given to matches that start near the end of a
+# chunk or shard before they are treated as final.
+DEFAULT_OVERLAP = 4096
+
+# Characters kept in front of a chunk or shard so anchors and lookbehinds
+# see the text preceding the boundary.
+CONTEXT = 64
+
+# Logs at least this long are split into shards and scanned by a process
+# pool; below it the IPC overhead outweighs the gain.
+PARALLEL_THRESHOLD = int(os.getenv("LOG_PARSER_PARALLEL_THRESHOLD", 8 * 1024 * 1024))
+PARALLEL_WORKERS = int(os.getenv("LOG_PARSER_WORKERS", os.cpu_count() or 1))
+
+# Characters per shard when summarizing in parallel; at most two shards per
+# worker are in flight, so the text copied to the pool at once stays bounded.
+SUMMARY_SHARD_SIZE = 4 * 1024 * 1024
+
+# Bumped whenever the shape of parse() results changes, so cached results
+# in the old shape are not served.
+RESULT_FORMAT = 2
+
+_NEWLINE = re.compile("\n")
+
+# Occurrences kept per category by LogParserEngine.summarize unless the
+# caller overrides them.
+DEFAULT_SUMMARY_CAPS = {"first": 10, "last": 10, "sample": 10}
+
+# Characters lower-cased at a time by the literal prefilter.
+PREFILTER_BLOCK = 1024 * 1024
+
+# The non-ASCII characters re.IGNORECASE matches to an ASCII letter that
+# lower() does not turn into it (the Kelvin sign "K" lower-cases to "k").
+# "İ" is also the only character whose lower() is longer than one.
+_ASCII_FOLDS = (("İ", "i"), ("ı", "i"), ("ſ", "s"))
+
+# Leading global inline flags such as "(?i)" are only legal at the very start
+# of an expression, so they are rewritten into a scoped group "(?i:...)"
+# before the pattern is embedded in the combined scanner.
+_GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def _scoped(pattern: str) -> str:
+    flags = _GLOBAL_FLAGS.match(pattern)
+    if not flags:
+        return pattern
+    return f"(?{flags.group(1)}:{pattern[flags.end():]})"
+
+
+def _first_chars(items, ignorecase: bool):
+    """Return the set of characters a parsed pattern can start with.
+
+    Only the shapes our patterns use are understood (literals, classes,
+    groups, alternations and non-optional repeats); anything else returns
+    None, meaning "may start anywhere".
+    """
+    if not items:
+        return None
+    op, av = items[0]
+    if op is sre_parse.LITERAL:
+        chars = {chr(av)}
+    elif op is sre_parse.IN:
+        chars = set()
+        for item_op, item_av in av:
+            if item_op is sre_parse.LITERAL:
+                chars.add(chr(item_av))
+            elif item_op is sre_parse.RANGE and item_av[1] - item_av[0] < 256:
+                chars.update(chr(c) for c in range(item_av[0], item_av[1] + 1))
+            else:
+                return None
+    elif op is sre_parse.SUBPATTERN:
+        _, add_flags, del_flags, sub = av
+        if add_flags & sre_parse.SRE_FLAG_IGNORECASE:
+            ignorecase = True
+        if del_flags & sre_parse.SRE_FLAG_IGNORECASE:
+            ignorecase = False
+        return _first_chars(list(sub), ignorecase)
+    elif op is sre_parse.BRANCH:
+        chars = set()
+        for branch in av[1]:
+            first = _first_chars(list(branch), ignorecase)
+            if first is None:
+                return None
+            chars |= first
+        return chars
+    elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+        return _first_chars(list(av[2]), ignorecase)
+    else:
+        return None
+    if ignorecase:
+        chars |= {c.lower() for c in chars} | {c.upper() for c in chars}
+    return chars
+
+
+def _pattern_first_chars(pattern: str):
+    parsed = sre_parse.parse(pattern)
+    return _first_chars(list(parsed), bool(parsed.state.flags & re.IGNORECASE))
+
+
+def line_index(content: str) -> array:
+    """Offsets at which lines 2, 3, ... of content start."""
+    return array("q", (match.end() for match in _NEWLINE.finditer(content)))
+
+
+def locate(starts: array, position: int, first_line: int = 1, first_column: int = 0) -> tuple:
+    """Return the 1-based (line, column) of position using a line_index.
+
+    ``first_line`` and ``first_column`` describe where the indexed text
+    itself begins, for text that is a window onto a larger log.
+    """
+    line = bisect_right(starts, position)
+    if line == 0:
+        return first_line, first_column + position + 1
+    return first_line + line, position - starts[line - 1] + 1
+
 
 class LogParserEngine:
-    def __init__(self):
+    def __init__(self, parallel_threshold: int = PARALLEL_THRESHOLD, workers: int = PARALLEL_WORKERS):
+        self.parallel_threshold = parallel_threshold
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Each entry is (pattern, description) or (pattern, description,
+        # anchors). Anchors are literals one of which every match of the
+        # pattern starts with, compared case-insensitively; anchored
+        # patterns are only tried where the prefilter finds an anchor.
         self.patterns = {
             "secrets": [
-                (r"(?i)(password|secret|key|token)\s*[:=]\s*['\"]?([a-zA-Z0-9@#$%^&+=]{8,})['\"]?", "Potential Secret"),
-                (r"AKIA[0-9A-Z]{16}", "AWS Access Key"),
-                (r"ghp_[a-zA-Z0-9]{36}", "GitHub Personal Access Token")
+                (r"(?i)(password|secret|key|token)\s*[:=]\s*['\"]?([a-zA-Z0-9@#$%^&+=]{8,})['\"]?", "Potential Secret",
+                 ("password", "secret", "key", "token")),
+                (r"AKIA[0-9A-Z]{16}", "AWS Access Key", ("AKIA",)),
+                (r"ghp_[a-zA-Z0-9]{36}", "GitHub Personal Access Token", ("ghp_",))
             ],
             "errors": [
-                (r"(?i)(error|exception|fail|fatal)", "Error/Failure")
+                (r"(?i)(error|exception|fail|fatal)", "Error/Failure", ("error", "exception", "fail", "fatal"))
             ],
             "urls": [
-                (r"https?://[^\s]+", "URL")
+                (r"https?://[^\s]+", "URL", ("http",))
             ]
         }
+        self._compile()
 
-    def parse(self, content: str) -> dict:
-        results = {
-            "secrets": [],
-            "errors": [],
-            "urls": []
+    def _compile(self):
+        """Build the scanners for every pattern in self.patterns.
+
+        Anchored patterns are dispatched from the literal prefilter (see
+        _candidates) by the first character of the anchor found. The others
+        become capturing lookahead alternatives of one combined scanner, so
+        a single walk over the content reports every position where one of
+        them starts a match, together with that pattern's span.
+        """
+        self._rules = []  # (category, description, compiled pattern)
+        self._dispatch = {}  # first anchor character -> anchored rule indices
+        self._scanned = []  # indices of rules without anchors
+        anchors = set()
+        alternatives = []
+        guard = set()
+        for category, entries in self.patterns.items():
+            for entry in entries:
+                pattern, description = entry[:2]
+                index = len(self._rules)
+                self._rules.append((category, description, re.compile(pattern)))
+                first = _pattern_first_chars(pattern)
+                if len(entry) > 2 and entry[2]:
+                    for anchor in entry[2]:
+                        anchor = anchor.lower()
+                        if not anchor or (first is not None and not {anchor[0], anchor[0].upper()} & first):
+                            raise ValueError(f"{pattern!r} cannot start with anchor {anchor!r}")
+                        anchors.add(anchor)
+                        rules = self._dispatch.setdefault(anchor[0], [])
+                        if index not in rules:
+                            rules.append(index)
+                    continue
+                self._scanned.append(index)
+                alternatives.append(f"(?=({_scoped(pattern)}))")
+                guard = None if guard is None or first is None else guard | first
+
+        # Anchors are searched for in lower-cased text as plain case-sensitive
+        # literals, which lets re skip ahead on their first characters. The
+        # fallback, for non-ASCII anchors, captures each anchor in its own
+        # group, as the text it matched may fold to the anchor without
+        # lower-casing to it.
+        self._anchor_scanner = None
+        self._ascii_anchors = all(anchor.isascii() for anchor in anchors)
+        self._anchor_length = 0
+        if anchors:
+            literals = sorted(anchors, key=len, reverse=True)
+            self._anchor_scanner = re.compile("|".join(re.escape(anchor) for anchor in literals))
+            self._anchor_fallback = re.compile(
+                "|".join(f"({re.escape(anchor)})" for anchor in literals), re.IGNORECASE
+            )
+            self._fallback_keys = [None] + [anchor[0] for anchor in literals]
+            self._anchor_length = len(literals[0])
+
+        self._scanner = None
+        if alternatives:
+            scanner = "|".join(alternatives)
+            if guard:
+                # Reject positions no pattern can start at with a single class
+                # test instead of trying every alternative there.
+                chars = "".join(re.escape(c) for c in sorted(guard))
+                scanner = f"(?=[{chars}])(?:{scanner})"
+            self._scanner = re.compile(scanner)
+
+        # Identifies the pattern set, so cached results from an older set
+        # of patterns are never served.
+        self.pattern_version = hashlib.sha256(
+            json.dumps([RESULT_FORMAT, self.patterns], sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+        # Map the outer group of each alternative back to its rule index.
+        self._group_rule = {}
+        group = 1
+        for index in self._scanned:
+            self._group_rule[group] = index
+            group += self._rules[index][2].groups + 1
+
+    def iter_matches(self, content: str, pos: int = 0, endpos: int = None, resume: list = None):
+        """Iterate over (rule index, start, end) for every match in content[pos:endpos].
+
+        Matches are produced in the order re.finditer would find them for
+        each pattern on its own: a pattern resumes searching at the end of
+        its previous match, but different patterns may overlap. Passing a
+        ``resume`` list carries that per-pattern state across calls; it is
+        only advanced for matches the caller actually consumed.
+        """
+        if endpos is None:
+            endpos = len(content)
+        if resume is None:
+            resume = [pos] * len(self._rules)
+
+        sources = []
+        if self._anchor_scanner is not None:
+            sources.append(self._iter_anchored(content, pos, endpos, resume))
+        if self._scanner is not None:
+            sources.append(self._iter_scanned(content, pos, endpos, resume))
+        if len(sources) == 1:
+            return sources[0]
+        return heapq.merge(*sources, key=lambda match: match[1])
+
+    def _candidates(self, content: str, pos: int, endpos: int):
+        """Yield every position in content[pos:endpos] where an anchor starts.
+
+        Content is lower-cased one block at a time, keeping the extra memory
+        bounded, and searched for the literal anchors. The few characters
+        re.IGNORECASE folds to an ASCII letter that lower() leaves alone
+        (e.g. "ſ" and "ı"), which the patterns themselves match, are mapped
+        to that letter first. With non-ASCII anchors, non-ASCII blocks are
+        searched with the slower case-insensitive form of the anchors.
+        """
+        for block in range(pos, endpos, PREFILTER_BLOCK):
+            stop = min(endpos, block + PREFILTER_BLOCK)
+            text = content[block:min(endpos, stop + self._anchor_length - 1)]
+            search = self._anchor_scanner.search
+            if text.isascii():
+                text = text.lower()
+            elif not self._ascii_anchors:
+                search = self._anchor_fallback.search
+            else:
+                for char, letter in _ASCII_FOLDS:
+                    text = text.replace(char, letter)
+                text = text.lower()
+            limit = stop - block
+            found = search(text)
+            while found is not None and found.start() < limit:
+                yield block + found.start()
+                found = search(text, found.start() + 1)
+
+    def _iter_anchored(self, content: str, pos: int, endpos: int, resume: list):
+        rules = self._rules
+        dispatch = self._dispatch
+        for start in self._candidates(content, pos, endpos):
+            candidates = dispatch.get(content[start].lower())
+            if candidates is None:
+                # A character re.IGNORECASE folds to an anchor's first one,
+                # found by the fallback or mapped by _ASCII_FOLDS
+                found = self._anchor_fallback.match(content, start)
+                candidates = dispatch[self._fallback_keys[found.lastindex]]
+            for index in candidates:
+                if start < resume[index]:
+                    continue
+                match = rules[index][2].match(content, start, endpos)
+                if match:
+                    yield index, start, match.end()
+                    resume[index] = match.end()
+
+    def _iter_scanned(self, content: str, pos: int, endpos: int, resume: list):
+        rules = self._rules
+        scanned = self._scanned
+        group_rule = self._group_rule
+
+        for hit in self._scanner.finditer(content, pos, endpos):
+            index = group_rule[hit.lastindex]
+            start, end = hit.span(hit.lastindex)
+            if start >= resume[index]:
+                yield index, start, end
+                resume[index] = end
+
+            # The scanner only reports the first alternative that matches at
+            # this position; later patterns may match here as well.
+            for other in scanned[scanned.index(index) + 1:]:
+                if start < resume[other]:
+                    continue
+                match = rules[other][2].match(content, start, endpos)
+                if match:
+                    yield other, start, match.end()
+                    resume[other] = match.end()
+
+    def parse(self, content: str, compact: bool = False) -> dict:
+        """Scan content and return its findings grouped by category.
+
+        By default each finding is a dict with its type, matched text,
+        character span and 1-based line/column. With ``compact`` the result
+        is columnar instead: a ``types`` table plus, per category, parallel
+        ``type`` (index into ``types``), ``start``, ``end`` and ``line``
+        arrays.
+        """
+        if self.workers > 1 and len(content) >= self.parallel_threshold:
+            spans = self._scan_parallel(content)
+        else:
+            spans = [[] for _ in self._rules]
+            for index, start, end in self.iter_matches(content):
+                spans[index].append((start, end))
+
+        starts = line_index(content) if any(spans) else array("q")
+        if compact:
+            return self._columnar(spans, starts)
+
+        results = {category: [] for category in self.patterns}
+        for index, found in enumerate(spans):
+            results[self._rules[index][0]].extend(
+                self._finding(content, starts, index, start, end) for start, end in found
+            )
+
+        return results
+
+    def summarize(self, content: str, caps: dict = None) -> dict:
+        """Scan content keeping only a bounded summary per category.
+
+        Each category reports its total ``count``, per-type ``counts``, the
+        ``first`` and ``last`` occurrences and a uniform reservoir
+        ``sample`` of the rest, so the result size does not depend on how
+        many matches the log holds. ``caps`` maps a category to overrides of
+        DEFAULT_SUMMARY_CAPS. The sample is seeded, so the same content
+        always yields the same summary.
+        """
+        caps = caps or {}
+        rng = random.Random(0)
+        summaries = {
+            category: _CategorySummary(rng, **{**DEFAULT_SUMMARY_CAPS, **caps.get(category, {})})
+            for category in self.patterns
         }
 
-        for pattern, description in self.patterns["secrets"]:
-            for match in re.finditer(pattern, content):
-                results["secrets"].append({
-                    "type": description,
-                    "match": match.group(0), # In production, we should mask this!
-                    "position": match.span()
-                })
-
-        for pattern, description in self.patterns["errors"]:
-            for match in re.finditer(pattern, content):
-                results["errors"].append({
-                    "type": description,
-                    "match": match.group(0),
-                    "position": match.span()
-                })
-
-        for pattern, description in self.patterns["urls"]:
-            for match in re.finditer(pattern, content):
-                results["urls"].append({
-                    "type": description,
-                    "match": match.group(0),
-                    "position": match.span()
-                })
+        if self.workers > 1 and len(content) >= self.parallel_threshold:
+            self._summarize_parallel(content, summaries)
+        else:
+            for index, start, end in self.iter_matches(content):
+                summaries[self._rules[index][0]].add(index, start, end)
 
+        starts = None
+        results = {}
+        for category, summary in summaries.items():
+            if summary.count and starts is None:
+                starts = line_index(content)
+            results[category] = summary.result(self, content, starts)
         return results
+
+    def _finding(self, content: str, starts: array, index: int, start: int, end: int) -> dict:
+        line, column = locate(starts, start)
+        return {
+            "type": self._rules[index][1],
+            "match": content[start:end], # In production, we should mask this!
+            "position": (start, end),
+            "line": line,
+            "column": column
+        }
+
+    def _columnar(self, spans: list, starts: array) -> dict:
+        types = []
+        findings = {
+            category: {"type": [], "start": [], "end": [], "line": []}
+            for category in self.patterns
+        }
+        for (category, description, _), found in zip(self._rules, spans):
+            if not found:
+                continue
+            if description not in types:
+                types.append(description)
+            type_id = types.index(description)
+            columns = findings[category]
+            columns["type"].extend([type_id] * len(found))
+            for start, end in found:
+                columns["start"].append(start)
+                columns["end"].append(end)
+                columns["line"].append(bisect_right(starts, start) + 1)
+        return {"types": types, "findings": findings}
+
+    def _scan_parallel(self, content: str) -> list:
+        """Scan line-aligned shards of content in the process pool.
+
+        Returns per-rule lists of global (start, end) spans, identical to a
+        serial scan. Where a shard disagrees with its predecessor about a
+        pattern (a match crossing the boundary, or one running into the end
+        of the shard's look-ahead), that pattern is rescanned here for the
+        rest of the shard against the full content.
+        """
+        spans = [[] for _ in self._rules]
+        resume = [0] * len(self._rules)
+        shard_size = len(content) // self.workers + 1
+        for lo, hi, found_by_rule in self._iter_shards(content, shard_size, _scan_shard):
+            for index, found in enumerate(found_by_rule):
+                for start, end, truncated in found:
+                    if start < resume[index] or truncated:
+                        spans[index].extend(self._rescan(content, index, max(resume[index], start), hi, resume))
+                        break
+                    spans[index].append((start, end))
+                    resume[index] = end
+        return spans
+
+    def _summarize_parallel(self, content: str, summaries: dict):
+        """Add the matches of content to summaries, summarized shard by shard in the process pool.
+
+        Workers return a bounded summary per rule instead of their spans, so
+        memory does not grow with the number of matches. A rule whose first
+        match in a shard overlaps the previous shard's last one is rescanned
+        here for that shard, as is a match running into the end of a
+        shard's look-ahead. Rule summaries are merged in shard order, so
+        the same content always yields the same summary, though its sample
+        is drawn differently from a serial scan's.
+        """
+        rule_caps = [summaries[category].caps() for category, _, _ in self._rules]
+        rng = random.Random(0)
+        resume = [0] * len(self._rules)
+        shards = self._iter_shards(content, SUMMARY_SHARD_SIZE, _summarize_shard, rule_caps)
+        for lo, hi, rule_summaries in shards:
+            for index, (summary, first_start, last_end, truncated) in enumerate(rule_summaries):
+                category = summaries[self._rules[index][0]]
+                summary.rng = rng
+                if first_start is not None and first_start < resume[index]:
+                    summary, truncated = _CategorySummary(rng, **rule_caps[index]), resume[index]
+                elif last_end is not None:
+                    resume[index] = last_end
+                if truncated is not None:
+                    for start, end in self._rescan(content, index, truncated, hi, resume):
+                        summary.add(index, start, end)
+                category.merge(summary)
+
+    def _iter_shards(self, content: str, shard_size: int, worker, *args):
+        """Yield (lo, hi, worker result) for line-aligned shards of about shard_size characters, in order.
+
+        Shards are submitted to the process pool as earlier ones are
+        consumed, at most two per worker at a time.
+        """
+        pool = self._get_pool()
+
+        def bounds():
+            lo = 0
+            while lo < len(content):
+                hi = content.find("\n", lo + shard_size)
+                hi = len(content) if hi == -1 else hi + 1
+                yield lo, hi
+                lo = hi
+
+        def submit(lo, hi):
+            begin = max(0, lo - CONTEXT)
+            stop = min(len(content), hi + DEFAULT_OVERLAP)
+            return lo, hi, pool.submit(
+                worker, content[begin:stop], begin, lo - begin, hi - begin, stop == len(content), *args
+            )
+
+        shards = bounds()
+        pending = deque(submit(lo, hi) for lo, hi in islice(shards, 2 * self.workers))
+        while pending:
+            lo, hi, future = pending.popleft()
+            pending.extend(submit(lo_next, hi_next) for lo_next, hi_next in islice(shards, 1))
+            yield lo, hi, future.result()
+
+    def _rescan(self, content: str, index: int, pos: int, hi: int, resume: list):
+        """Yield the spans of rule index from pos up to hi against the full content, advancing resume."""
+        compiled = self._rules[index][2]
+        limit = min(len(content), hi + DEFAULT_OVERLAP)
+        while True:
+            match = compiled.search(content, pos, limit)
+            if not match or match.start() >= hi:
+                return
+            if match.end() >= limit:
+                match = compiled.match(content, match.start())
+            resume[index] = pos = match.end()
+            yield match.span()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """The process pool, created on first use.
+
+        Requests scan in threadpool threads, so creation is locked: two
+        large logs arriving together must not each start a pool.
+        """
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(self.patterns,)
+                    )
+        return self._pool
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+class _CategorySummary:
+    """Bounded accumulator of one category's matches for summarize()."""
+
+    def __init__(self, rng: random.Random, first: int, last: int, sample: int):
+        self.rng = rng
+        self.first_cap = first
+        self.last_cap = last
+        self.sample_cap = sample
+        self.count = 0
+        self.counts = {}
+        self.first = []
+        self.last = deque(maxlen=last)
+        self.sample = []
+
+    def add(self, index: int, start: int, end: int):
+        match = (start, index, end)
+        self.count += 1
+        self.counts[index] = self.counts.get(index, 0) + 1
+        if len(self.first) < self.first_cap:
+            self.first.append(match)
+        self.last.append(match)
+        if len(self.sample) < self.sample_cap:
+            self.sample.append(match)
+        else:
+            slot = self.rng.randrange(self.count)
+            if slot < self.sample_cap:
+                self.sample[slot] = match
+
+    def caps(self) -> dict:
+        return {"first": self.first_cap, "last": self.last_cap, "sample": self.sample_cap}
+
+    def merge(self, other: "_CategorySummary"):
+        """Fold in the summary of matches disjoint from this one's, e.g. another rule's or shard's."""
+        if not other.count:
+            return
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.first = heapq.nsmallest(self.first_cap, self.first + other.first)
+        self.last = deque(heapq.nlargest(self.last.maxlen, list(self.last) + list(other.last))[::-1],
+                          maxlen=self.last.maxlen)
+
+        # Draw the merged sample from both samples, each in proportion to
+        # the matches it stands for, so it stays uniform over all of them.
+        pools = [list(self.sample), list(other.sample)]
+        remaining = [self.count, other.count]
+        sample = []
+        for _ in range(min(self.sample_cap, self.count + other.count)):
+            side = 0 if self.rng.randrange(remaining[0] + remaining[1]) < remaining[0] else 1
+            pool = pools[side]
+            sample.append(pool.pop(self.rng.randrange(len(pool))))
+            remaining[side] -= 1
+        self.sample = sample
+        self.count += other.count
+
+    def result(self, engine: LogParserEngine, content: str, starts: array) -> dict:
+        counts = {}
+        for index, count in self.counts.items():
+            description = engine._rules[index][1]
+            counts[description] = counts.get(description, 0) + count
+
+        def findings(matches):
+            return [engine._finding(content, starts, index, start, end) for start, index, end in matches]
+
+        return {
+            "count": self.count,
+            "counts": counts,
+            "first": findings(self.first),
+            "last": findings(self.last),
+            "sample": findings(sorted(self.sample))
+        }
+
+
+_worker_engine = None
+
+
+def _init_worker(patterns: dict):
+    global _worker_engine
+    _worker_engine = LogParserEngine(workers=1)
+    _worker_engine.patterns = patterns
+    _worker_engine._compile()
+
+
+def _scan_shard(text: str, offset: int, lo: int, hi: int, last: bool) -> list:
+    """Scan text[lo:hi] in a pool worker.
+
+    Returns per-rule lists of (start, end, truncated) with offsets rebased
+    to the whole log; ``truncated`` marks matches that ran into the end of
+    the shard's look-ahead and may be longer in the full content.
+    """
+    spans = [[] for _ in _worker_engine._rules]
+    for index, start, end in _worker_engine.iter_matches(text, lo):
+        if start >= hi:
+            break
+        spans[index].append((start + offset, end + offset, not last and end >= len(text)))
+    return spans
+
+
+def _summarize_shard(text: str, offset: int, lo: int, hi: int, last: bool, rule_caps: list) -> list:
+    """Summarize the matches in text[lo:hi] per rule in a pool worker.
+
+    Returns, per rule, its summary (with offsets rebased to the whole log),
+    the start of its first match, the end of its last summarized match, and
+    the start of a match that ran into the end of the shard's look-ahead,
+    which is left out of the summary.
+    """
+    rng = random.Random(offset + lo)
+    summaries = [_CategorySummary(rng, **caps) for caps in rule_caps]
+    bounds = [[None, None, None] for _ in rule_caps]  # first start, last end, truncated start
+    for index, start, end in _worker_engine.iter_matches(text, lo):
+        if start >= hi:
+            break
+        state = bounds[index]
+        if state[0] is None:
+            state[0] = start + offset
+        if not last and end >= len(text):
+            state[2] = start + offset
+            continue
+        summaries[index].add(index, start + offset, end + offset)
+        state[1] = end + offset
+    for summary in summaries:
+        summary.rng = None  # not sent back; merging uses the caller's
+    return [(summary, *state) for summary, state in zip(summaries, bounds)]
+
+
+class LogStreamParser:
+    """Incremental front end to LogParserEngine for logs that arrive in chunks.
+
+    Text is buffered until at least ``overlap`` characters lie past the
+    region being scanned, so every match starting in that region is decided
+    with the same look-ahead it would get on the whole log. Matches running
+    into the end of the buffer are held back until more text arrives, and
+    the engine's per-pattern resume offsets are carried over, so findings at
+    a chunk boundary are neither lost nor reported twice. Memory stays
+    bounded by one chunk plus twice the overlap; a single match longer than
+    the overlap is cut at the buffer end.
+
+    Findings are returned in position order as (category, finding) pairs,
+    with positions and line/column numbers relative to the whole stream.
+    """
+
+    def __init__(self, engine: LogParserEngine, overlap: int = DEFAULT_OVERLAP):
+        self.engine = engine
+        self.overlap = overlap
+        self._buffer = ""
+        self._offset = 0  # stream offset of self._buffer[0]
+        self._line = 1  # line and 0-based column of self._buffer[0]
+        self._column = 0
+        self._pos = 0  # buffer index the next scan starts at
+        self._resume = [0] * len(engine._rules)
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        if len(self._buffer) - self._pos < 2 * self.overlap:
+            return []
+        return self._scan(final=False)
+
+    def close(self) -> list:
+        return self._scan(final=True)
+
+    def _scan(self, final: bool) -> list:
+        buffer = self._buffer
+        size = len(buffer)
+        limit = size if final else size - self.overlap
+        next_pos = limit
+        findings = []
+        starts = None
+
+        for index, start, end in self.engine.iter_matches(buffer, self._pos, size, self._resume):
+            if start >= limit:
+                break
+            if not final and end >= size and end - start < self.overlap:
+                # The match may continue in the next chunk; rescan from here.
+                next_pos = start
+                break
+            if starts is None:
+                starts = line_index(buffer)
+            line, column = locate(starts, start, self._line, self._column)
+            category, description, _ = self.engine._rules[index]
+            findings.append((category, {
+                "type": description,
+                "match": buffer[start:end], # In production, we should mask this!
+                "position": (start + self._offset, end + self._offset),
+                "line": line,
+                "column": column
+            }))
+
+        keep = max(0, next_pos - CONTEXT)
+        newlines = buffer.count("\n", 0, keep)
+        if newlines:
+            self._line += newlines
+            self._column = keep - buffer.rfind("\n", 0, keep) - 1
+        else:
+            self._column += keep
+        self._buffer = buffer[keep:]
+        self._offset += keep
+        self._pos = next_pos - keep
+        self._resume = [max(0, r - keep) for r in self._resume]
+        return findings
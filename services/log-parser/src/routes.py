@@ -1,35 +1,295 @@
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from .parser_engine import LogParserEngine
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+from .parser_engine import LogParserEngine, LogStreamParser
+from .cache import ParseResultCache, content_hash
 from datetime import datetime
+from bson import ObjectId
+import base64
+import codecs
+import json
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse for a generator that is still reading the request body.
+
+    StreamingResponse watches for client disconnects by reading request
+    messages itself, which races the generator for body chunks. Here the
+    generator's own reads of the body see a disconnect instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
 
 router = APIRouter()
 engine = LogParserEngine()
+result_cache = ParseResultCache()
+
+class SummaryCaps(BaseModel):
+    first: int = Field(10, ge=0)
+    last: int = Field(10, ge=0)
+    sample: int = Field(10, ge=0)
 
 class LogRequest(BaseModel):
     content: str
     metadata: dict = {}
+    compact: bool = False  # columnar analysis, see LogParserEngine.parse
+    summary: bool = False  # bounded analysis, see LogParserEngine.summarize
+    caps: Dict[str, SummaryCaps] = {}  # per-category caps for summary mode
+
+class LogBatchRequest(BaseModel):
+    logs: List[LogRequest]
+
+def analysis_mode(log_req: LogRequest) -> str:
+    """Name the shape of analysis a request asks for; part of the cache key."""
+    if log_req.summary:
+        caps = {category: cap.dict() for category, cap in sorted(log_req.caps.items())}
+        return "summary:" + json.dumps(caps, sort_keys=True)
+    return "compact" if log_req.compact else "records"
+
+def finding_types(analysis: dict, mode: str) -> list:
+    """Distinct finding types of an analysis, stored for filtering in GET /logs."""
+    if mode == "compact":
+        return list(analysis["types"])
+    if mode == "records":
+        return sorted({finding["type"] for findings in analysis.values() for finding in findings})
+    return sorted({type_ for summary in analysis.values() for type_ in summary["counts"]})
+
+async def parse_result(log_req: LogRequest, mode: str) -> dict:
+    """Analyse a log: the part of its result document shared by identical logs."""
+    # Parsing is CPU-bound; keep it off the event loop.
+    if log_req.summary:
+        caps = {category: cap.dict() for category, cap in log_req.caps.items()}
+        analysis = await run_in_threadpool(engine.summarize, log_req.content, caps)
+    else:
+        analysis = await run_in_threadpool(engine.parse, log_req.content, log_req.compact)
+    return {"analysis": analysis, "finding_types": finding_types(analysis, mode), "analysis_mode": mode}
+
+def build_result_document(log_req: LogRequest, digest: str, result: dict) -> dict:
+    return {
+        "timestamp": datetime.utcnow(),
+        "metadata": log_req.metadata,
+        "analysis": result["analysis"],
+        "finding_types": result["finding_types"],
+        "original_content_preview": log_req.content[:200],  # Store a preview
+        "content_hash": digest,
+        "pattern_version": engine.pattern_version,
+        "analysis_mode": result["analysis_mode"]
+    }
+
+async def find_cached_result(request: Request, digest: str, mode: str):
+    """Return the parse result of an identical log analysed before, if any."""
+    key = (digest, engine.pattern_version, mode)
+    result = result_cache.get(key)
+    if result is None and hasattr(request.app, 'database'):
+        result = await request.app.database["parsed_logs"].find_one(
+            {"content_hash": digest, "pattern_version": engine.pattern_version, "analysis_mode": mode},
+            {"_id": 0, "analysis": 1, "finding_types": 1, "analysis_mode": 1}
+        )
+        if result is not None:
+            result_cache.put(key, result)
+    return result
 
 @router.post("/parse")
 async def parse_log(request: Request, log_req: LogRequest):
     try:
-        analysis = engine.parse(log_req.content)
-        
-        result_document = {
-            "timestamp": datetime.utcnow(),
-            "metadata": log_req.metadata,
-            "analysis": analysis,
-            "original_content_preview": log_req.content[:200]  # Store a preview
-        }
-        
-        # Save to MongoDB
+        digest = content_hash(log_req.content)
+        mode = analysis_mode(log_req)
+        result = await find_cached_result(request, digest, mode)
+        cache_hit = result is not None
+        if not cache_hit:
+            result = await parse_result(log_req, mode)
+            result_cache.put((digest, engine.pattern_version, mode), result)
+
+        # Every upload is stored with its own metadata, even when its analysis was cached
+        result_document = build_result_document(log_req, digest, result)
         if hasattr(request.app, 'database'):
-            new_log = request.app.database["parsed_logs"].insert_one(result_document)
+            new_log = await request.app.database["parsed_logs"].insert_one(result_document)
             result_document["_id"] = str(new_log.inserted_id)
         
         return {
             "status": "success",
+            "cache_hit": cache_hit,
             "data": result_document
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/parse/batch")
+async def parse_log_batch(request: Request, batch_req: LogBatchRequest):
+    """Parse several logs and store them with a single insert_many."""
+    try:
+        result_documents = []
+        cache_hits = []
+        new_results = {}  # (content hash, mode) -> result parsed in this batch
+        for log_req in batch_req.logs:
+            digest = content_hash(log_req.content)
+            key = (digest, analysis_mode(log_req))
+            result = new_results.get(key) or await find_cached_result(request, *key)
+            cache_hits.append(result is not None)
+            if result is None:
+                result = await parse_result(log_req, key[1])
+                new_results[key] = result
+            result_documents.append(build_result_document(log_req, digest, result))
+
+        # Save to MongoDB
+        if result_documents and hasattr(request.app, 'database'):
+            new_logs = await request.app.database["parsed_logs"].insert_many(result_documents)
+            for result_document, inserted_id in zip(result_documents, new_logs.inserted_ids):
+                result_document["_id"] = str(inserted_id)
+        for (digest, mode), result in new_results.items():
+            result_cache.put((digest, engine.pattern_version, mode), result)
+
+        return {
+            "status": "success",
+            "count": len(result_documents),
+            "cache_hit": cache_hits,
+            "data": result_documents
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/parse/stream")
+async def parse_log_stream(request: Request):
+    """Parse a raw-text (optionally chunked) request body incrementally.
+
+    Findings are streamed back as NDJSON lines while the body is read, so
+    memory stays bounded whatever the size of the log. Query parameters are
+    stored as the log metadata; the last line carries the per-category
+    counts and the id of the stored summary document.
+    """
+    metadata = dict(request.query_params)
+
+    async def stream_findings():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parser = LogStreamParser(engine)
+        counts = {category: 0 for category in engine.patterns}
+        types = set()
+        preview = ""
+
+        def emit(findings):
+            for category, finding in findings:
+                counts[category] += 1
+                types.add(finding["type"])
+                yield json.dumps({"category": category, **finding}) + "\n"
+
+        async for chunk in request.stream():
+            text = decoder.decode(chunk)
+            if len(preview) < 200:
+                preview += text[:200 - len(preview)]
+            findings = await run_in_threadpool(parser.feed, text)
+            for line in emit(findings):
+                yield line
+
+        tail = decoder.decode(b"", final=True)
+        for line in emit(parser.feed(tail) + parser.close()):
+            yield line
+
+        result_document = {
+            "timestamp": datetime.utcnow(),
+            "metadata": metadata,
+            "summary": counts,
+            "finding_types": sorted(types),
+            "original_content_preview": preview
+        }
+
+        # Save to MongoDB
+        if hasattr(request.app, 'database'):
+            new_log = await request.app.database["parsed_logs"].insert_one(result_document)
+            result_document["_id"] = str(new_log.inserted_id)
+
+        result_document["timestamp"] = result_document["timestamp"].isoformat()
+        yield json.dumps({"status": "success", "data": result_document}) + "\n"
+
+    return RequestStreamingResponse(stream_findings(), media_type="application/x-ndjson")
+
+def encode_cursor(document: dict) -> str:
+    key = json.dumps([document["timestamp"].isoformat(), str(document["_id"])])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor: str) -> dict:
+    """Turn a cursor into the filter for documents strictly after it."""
+    try:
+        timestamp, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp, log_id = datetime.fromisoformat(timestamp), ObjectId(log_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": log_id}}
+    ]}
+
+@router.get("")
+async def list_logs(
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    finding_type: List[str] = Query([]),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    include_analysis: bool = False
+):
+    """List parsed logs, newest first, with keyset pagination.
+
+    ``metadata.<field>=<value>`` query parameters filter on metadata
+    fields; ``finding_type`` (repeatable) keeps logs having any of the
+    given finding types. Pass the returned ``next_cursor`` back as
+    ``cursor`` to get the following page.
+    """
+    if not hasattr(request.app, 'database'):
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    conditions = []
+    if since or until:
+        timestamp = {}
+        if since:
+            timestamp["$gte"] = since
+        if until:
+            timestamp["$lt"] = until
+        conditions.append({"timestamp": timestamp})
+    for key, value in request.query_params.items():
+        if key.startswith("metadata."):
+            conditions.append({key: value})
+    if finding_type:
+        conditions.append({"finding_types": {"$in": finding_type}})
+    if cursor:
+        conditions.append(decode_cursor(cursor))
+
+    query = {"$and": conditions} if conditions else {}
+    projection = None if include_analysis else {"analysis": 0}
+    documents = await request.app.database["parsed_logs"].find(query, projection) \
+        .sort([("timestamp", -1), ("_id", -1)]) \
+        .limit(limit) \
+        .to_list(length=limit)
+
+    next_cursor = encode_cursor(documents[-1]) if len(documents) == limit else None
+    for document in documents:
+        document["_id"] = str(document["_id"])
+
+    return {
+        "status": "success",
+        "count": len(documents),
+        "next_cursor": next_cursor,
+        "data": documents
+    }
+
+@router.get("/{log_id}")
+async def get_log(request: Request, log_id: str, include_analysis: bool = False):
+    if not hasattr(request.app, 'database'):
+        raise HTTPException(status_code=503, detail="Database not available")
+    if not ObjectId.is_valid(log_id):
+        raise HTTPException(status_code=404, detail="Log not found")
+
+    projection = None if include_analysis else {"analysis": 0}
+    document = await request.app.database["parsed_logs"].find_one({"_id": ObjectId(log_id)}, projection)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Log not found")
+
+    document["_id"] = str(document["_id"])
+    return {
+        "status": "success",
+        "data": document
+    }
@@ -0,0 +1,115 @@
+import re
+import threading
+import time
+
+import pytest
+
+from src.parser_engine import _ASCII_FOLDS, LogParserEngine
+
+engine = LogParserEngine(workers=1)
+
+
+def baseline(content):
+    """Findings of each pattern run on its own with re.finditer, as (type, span) per category."""
+    return {
+        category: sorted((entry[1], match.span()) for entry in entries for match in re.finditer(entry[0], content))
+        for category, entries in engine.patterns.items()
+    }
+
+
+def findings(results):
+    return {
+        category: sorted((finding["type"], finding["position"]) for finding in found)
+        for category, found in results.items()
+    }
+
+
+@pytest.mark.parametrize("content", [
+    "paſſword=abcdefghij",  # "ſ" folds to "s" under re.IGNORECASE
+    "Exceptıon raised",  # "ı" folds to "i"
+    "İd token: abcdefghijk",
+    "ſecret=abcdefghijk and KEY=12345678",
+    "naïve build error at https://example.com/x",
+    "✓ build ok\n✓ tests passed token=abcdefghijk\n✗ deploy FAILED, see https://ci.example.com/1",
+    "🚀 ſecret=abcdefghijk İSTANBUL KEY=12345678 Exceptıon",
+])
+def test_case_folded_anchors_match_like_the_patterns(content):
+    expected = baseline(content)
+    assert any(expected.values())
+    assert findings(engine.parse(content)) == expected
+
+
+
+def test_ascii_folds_cover_every_special_case_fold():
+    letters = re.compile("[a-z]", re.IGNORECASE)
+    folds = dict(_ASCII_FOLDS)
+    for code in range(0x80, 0x110000):
+        char = chr(code)
+        if char in folds:
+            assert re.fullmatch(char, folds[char], re.IGNORECASE)
+        else:
+            # Block offsets survive lower-casing, and it finds every other fold
+            assert len(char.lower()) == 1
+            assert not letters.fullmatch(char) or char.lower().isascii()
+
+
+# Matches of every category for the small shards below. Secrets may span
+# lines, so some cross a shard boundary ("key=" then "token=...", itself a
+# match the next shard finds), and one runs past a shard's look-ahead.
+PARALLEL_CONTENT = "".join(
+    f"step {i} failed: error at https://ci.example.com/{i} token=abcdefghijk{i}\n"
+    + "x" * (i % 37) + "\n"
+    + ("key=" + " " * 60 + "\ntoken=abcdefgh12\n") * (i % 3 == 0)
+    + ("password:" + "\n" * 5000 + "abcdefghijk\n") * (i == 1000)
+    for i in range(2000)
+)
+
+
+@pytest.fixture
+def parallel_engine(monkeypatch):
+    monkeypatch.setattr("src.parser_engine.SUMMARY_SHARD_SIZE", 4096)
+    parallel = LogParserEngine(parallel_threshold=1, workers=2)
+    yield parallel
+    parallel.close()
+
+
+def test_parallel_parse_matches_serial(parallel_engine):
+    assert parallel_engine.parse(PARALLEL_CONTENT) == engine.parse(PARALLEL_CONTENT)
+
+
+def test_parallel_summary_matches_serial(parallel_engine):
+    caps = {"errors": {"first": 3, "last": 5, "sample": 7}}
+    expected = engine.summarize(PARALLEL_CONTENT, caps)
+    summary = parallel_engine.summarize(PARALLEL_CONTENT, caps)
+    for category, found in expected.items():
+        for key in ("count", "counts", "first", "last"):
+            assert summary[category][key] == found[key]
+        assert len(summary[category]["sample"]) == len(found["sample"])
+        assert all(finding["match"] in PARALLEL_CONTENT for finding in summary[category]["sample"])
+    assert parallel_engine.summarize(PARALLEL_CONTENT, caps) == summary
+
+
+def test_concurrent_scans_share_one_pool(monkeypatch):
+    created = []
+    barrier = threading.Barrier(8)
+
+    class SlowPool:
+        def __init__(self, **kwargs):
+            created.append(self)
+            time.sleep(0.05)  # widen the window in which another thread could start a second pool
+
+    monkeypatch.setattr("src.parser_engine.ProcessPoolExecutor", SlowPool)
+    parallel = LogParserEngine(parallel_threshold=1, workers=2)
+    pools = []
+
+    def get_pool():
+        barrier.wait()
+        pools.append(parallel._get_pool())
+
+    threads = [threading.Thread(target=get_pool) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
@@ -0,0 +1,75 @@
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.routes import result_cache, router
+
+
+class Collection:
+    """The parts of a Motor collection the parse routes use, in memory."""
+
+    def __init__(self):
+        self.documents = []
+
+    async def insert_one(self, document):
+        document["_id"] = ObjectId()
+        self.documents.append(dict(document))
+        return type("InsertOneResult", (), {"inserted_id": document["_id"]})
+
+    async def insert_many(self, documents):
+        inserted_ids = [(await self.insert_one(document)).inserted_id for document in documents]
+        return type("InsertManyResult", (), {"inserted_ids": inserted_ids})
+
+    async def find_one(self, query, projection=None):
+        for document in self.documents:
+            if all(document.get(key) == value for key, value in query.items()):
+                fields = [key for key, shown in (projection or {}).items() if shown] or list(document)
+                return {key: document[key] for key in fields}
+        return None
+
+
+def clear_cache():
+    result_cache._entries.clear()
+    result_cache._size = 0
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(router, prefix="/logs")
+    app.database = {"parsed_logs": Collection()}
+    return TestClient(app), app.database["parsed_logs"]
+
+
+LOG = "Deployment started\nError: Connection refused\nAPI_TOKEN=abcdefghijk"
+
+
+def test_cache_hits_store_a_document_with_the_callers_metadata():
+    for cached in (True, False):  # served from the memory cache, then from parsed_logs
+        clear_cache()
+        client, collection = make_client()
+        first = client.post("/logs/parse", json={"content": LOG, "metadata": {"jobId": "job-1"}}).json()
+        if not cached:
+            clear_cache()
+        second = client.post("/logs/parse", json={"content": LOG, "metadata": {"jobId": "job-2"}}).json()
+
+        assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+        assert second["data"]["metadata"] == {"jobId": "job-2"}
+        assert second["data"]["_id"] != first["data"]["_id"]
+        assert second["data"]["analysis"] == first["data"]["analysis"]
+        assert [document["metadata"] for document in collection.documents] == [{"jobId": "job-1"}, {"jobId": "job-2"}]
+
+
+def test_batch_stores_every_log():
+    clear_cache()
+    client, collection = make_client()
+    client.post("/logs/parse", json={"content": LOG, "metadata": {"jobId": "job-0"}})
+    response = client.post("/logs/parse/batch", json={"logs": [
+        {"content": LOG, "metadata": {"jobId": "job-1"}},
+        {"content": "fatal: boom", "metadata": {"jobId": "job-2"}},
+        {"content": "fatal: boom", "metadata": {"jobId": "job-3"}},
+    ]}).json()
+
+    assert response["cache_hit"] == [True, False, True]
+    assert [document["metadata"]["jobId"] for document in response["data"]] == ["job-1", "job-2", "job-3"]
+    assert len({document["_id"] for document in response["data"]}) == 3
+    assert len(collection.documents) == 4
@@ -0,0 +1,163 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .metrics import scan_metrics
+from .models import Finding, RuleRecord, Vulnerability, VulnerabilityReport
+
+# Rule text already written to the rules table by this process: rule id -> (severity, description, remediation)
+_stored_rules = {}
+_stored_rules_lock = threading.Lock()
+
+# Inserts supporting ON CONFLICT, per database backend.
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _store_rules(db: Session, vulnerabilities: List[Vulnerability]):
+    rules = {}
+    for v in vulnerabilities:
+        rules[v.rule_id] = (v.severity, v.description, v.remediation)
+    with _stored_rules_lock:
+        changed = {rule_id: text for rule_id, text in rules.items() if _stored_rules.get(rule_id) != text}
+    if not changed:
+        return changed
+    rows = [
+        {"id": rule_id, "severity": severity, "description": description, "remediation": remediation}
+        for rule_id, (severity, description, remediation) in changed.items()
+    ]
+    insert_rules = DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if insert_rules is None:
+        for row in rows:
+            db.merge(RuleRecord(**row))
+    else:
+        # An upsert, so concurrent scans storing the same new rule do not conflict
+        statement = insert_rules(RuleRecord)
+        db.execute(statement.on_conflict_do_update(index_elements=["id"], set_={
+            "severity": statement.excluded.severity,
+            "description": statement.excluded.description,
+            "remediation": statement.excluded.remediation,
+            "updated_at": func.now()
+        }), rows)
+    return changed
+
+
+def save_findings(db: Session, scan_id: str, vulnerabilities: List[Vulnerability], create_report: bool = True):
+    """Store the findings of scan_id, creating its report row if asked.
+
+    Findings are written with a single executemany insert; the rule text
+    they refer to goes to the rules table, only when new or changed.
+    """
+    if create_report:
+        db.add(VulnerabilityReport(scan_id=scan_id))
+    changed = _store_rules(db, vulnerabilities)
+    if vulnerabilities:
+        db.flush()  # the report row first
+        db.execute(insert(Finding), [
+            {
+                "scan_id": scan_id,
+                "rule_id": v.rule_id,
+                "severity": v.severity,
+                "affected_resource": v.affected_resource
+            }
+            for v in vulnerabilities
+        ])
+    if scan_metrics is None:
+        db.commit()
+    else:
+        with scan_metrics.commit_timer():
+            db.commit()
+    with _stored_rules_lock:
+        _stored_rules.update(changed)
+
+
+def _finding_query(db: Session, scan_id: str):
+    return db.query(
+        Finding.id, Finding.rule_id, Finding.severity, Finding.affected_resource,
+        RuleRecord.description, RuleRecord.remediation
+    ).join(RuleRecord, Finding.rule_id == RuleRecord.id).filter(Finding.scan_id == scan_id)
+
+
+def _vulnerability(row) -> Vulnerability:
+    return Vulnerability(
+        rule_id=row.rule_id,
+        severity=row.severity,
+        description=row.description,
+        affected_resource=row.affected_resource,
+        remediation=row.remediation
+    )
+
+
+def _legacy_findings(db: Session, scan_id: str) -> Optional[List[dict]]:
+    """Findings of scan_id stored inline in its reports, or None if there is no such scan.
+
+    Reports written before the findings table keep their findings inline.
+    """
+    reports = db.query(VulnerabilityReport.findings).filter(VulnerabilityReport.scan_id == scan_id) \
+        .order_by(VulnerabilityReport.id).all()
+    if not reports:
+        return None
+    return [finding for (report_findings,) in reports for finding in report_findings or []]
+
+
+def load_vulnerabilities(db: Session, scan_id: str) -> Optional[List[Vulnerability]]:
+    """All findings of scan_id, or None if there is no such scan."""
+    legacy = _legacy_findings(db, scan_id)
+    if legacy is None:
+        return None
+    vulnerabilities = [Vulnerability(**finding) for finding in legacy]
+    vulnerabilities.extend(_vulnerability(row) for row in _finding_query(db, scan_id).order_by(Finding.id))
+    return vulnerabilities
+
+
+def page_findings(db: Session, scan_id: str, cursor: Optional[int], limit: int,
+                  severity: Optional[str] = None, rule_id: Optional[str] = None) -> Tuple[List[Vulnerability], Optional[int]]:
+    """One page of findings in id order, and the cursor of the next page.
+
+    Scans without rows in the findings table are paged through the findings
+    stored inline in their reports instead, see _page_legacy_findings.
+    """
+    if db.query(Finding.id).filter(Finding.scan_id == scan_id).first() is None:
+        return _page_legacy_findings(db, scan_id, cursor, limit, severity, rule_id)
+    query = _finding_query(db, scan_id)
+    if cursor is not None:
+        query = query.filter(Finding.id > cursor)
+    if severity:
+        query = query.filter(Finding.severity == severity)
+    if rule_id:
+        query = query.filter(Finding.rule_id == rule_id)
+
+    rows = query.order_by(Finding.id).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [_vulnerability(row) for row in rows[:limit]], next_cursor
+
+
+def _page_legacy_findings(db: Session, scan_id: str, cursor: Optional[int], limit: int,
+                          severity: Optional[str], rule_id: Optional[str]) -> Tuple[List[Vulnerability], Optional[int]]:
+    # The cursor is the 1-based position of the last finding returned in the inline list.
+    matches = [
+        (position, finding) for position, finding in enumerate(_legacy_findings(db, scan_id) or [], 1)
+        if position > (cursor or 0)
+        and (not severity or finding["severity"] == severity)
+        and (not rule_id or finding["rule_id"] == rule_id)
+    ]
+    next_cursor = matches[limit - 1][0] if len(matches) > limit else None
+    return [Vulnerability(**finding) for _, finding in matches[:limit]], next_cursor
+
+
+def summarize_scan(db: Session, scan_id: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Finding counts of scan_id per severity and per rule, counted by the database."""
+    summary = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    rules = {}
+    for finding in _legacy_findings(db, scan_id) or []:
+        summary[finding["severity"]] = summary.get(finding["severity"], 0) + 1
+        rules[finding["rule_id"]] = rules.get(finding["rule_id"], 0) + 1
+    rows = db.query(Finding.rule_id, Finding.severity, func.count(Finding.id)) \
+        .filter(Finding.scan_id == scan_id) \
+        .group_by(Finding.rule_id, Finding.severity).all()
+    for rule_id, severity, count in rows:
+        summary[severity] = summary.get(severity, 0) + count
+        rules[rule_id] = rules.get(rule_id, 0) + count
+    return summary, rules
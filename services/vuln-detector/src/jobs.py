@@ -0,0 +1,172 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .database import database
+from .findings import save_findings
+from .rules_engine import RulesEngine, severity_summary
+
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "2"))
+# Jobs waiting for a worker; submissions beyond this are refused.
+SCAN_QUEUE_SIZE = int(os.getenv("SCAN_QUEUE_SIZE", "100"))
+# Logs evaluated between progress updates and cancellation checks.
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "500"))
+# Finished jobs kept in memory for polling (status and counts; findings are
+# always read from the database); older ones are read from the database.
+SCAN_JOBS_RETAINED = int(os.getenv("SCAN_JOBS_RETAINED", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def save_report(scan_id: str, vulnerabilities: List, create_report: bool = True) -> None:
+    """Store findings of scan_id in a session of its own."""
+    db = database.session()
+    try:
+        save_findings(db, scan_id, vulnerabilities, create_report)
+    finally:
+        db.close()
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobExists(Exception):
+    pass
+
+
+class ScanJob:
+    def __init__(self, scan_id: str, logs: List[Dict[str, Any]]):
+        self.scan_id = scan_id
+        self.logs = logs
+        self.status = QUEUED
+        self.processed = 0
+        self.total = len(logs)
+        self.summary = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scan_id": self.scan_id,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "summary": dict(self.summary),
+            "error": self.error
+        }
+
+
+class ScanJobQueue:
+    """Bounded queue of scan jobs evaluated by a fixed pool of worker threads.
+
+    Progress and the running severity summary of each job are updated after
+    every batch of logs, which is also when cancellation is checked.
+    """
+
+    def __init__(self, rules_engine: RulesEngine, workers: int = SCAN_WORKERS,
+                 queue_size: int = SCAN_QUEUE_SIZE, batch_size: int = SCAN_BATCH_SIZE):
+        self.rules_engine = rules_engine
+        self.workers = workers
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()  # scan_id -> ScanJob, oldest first
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"scan-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, scan_id: str, logs: List[Dict[str, Any]]) -> ScanJob:
+        job = ScanJob(scan_id, logs)
+        with self._lock:
+            existing = self._jobs.get(scan_id)
+            if existing is not None and not existing.finished:
+                raise JobExists(scan_id)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull()
+            self._jobs.pop(scan_id, None)
+            self._jobs[scan_id] = job
+            self._forget_finished()
+        return job
+
+    def get(self, scan_id: str) -> Optional[ScanJob]:
+        with self._lock:
+            return self._jobs.get(scan_id)
+
+    def cancel(self, scan_id: str) -> Optional[ScanJob]:
+        job = self.get(scan_id)
+        if job is None:
+            return None
+        job.cancel_requested.set()
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        return job
+
+    def _forget_finished(self):
+        finished = [scan_id for scan_id, job in self._jobs.items() if job.finished]
+        for scan_id in finished[:max(0, len(self._jobs) - SCAN_JOBS_RETAINED)]:
+            del self._jobs[scan_id]
+
+    def _finish(self, job: ScanJob, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        job.logs = None  # the raw export is no longer needed
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                if not job.finished:
+                    self._run(job)
+            except Exception as e:
+                self._finish(job, FAILED, str(e))
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: ScanJob):
+        job.status = RUNNING
+        ruleset = self.rules_engine.ruleset  # every batch uses the rules the job started with
+        vulnerabilities = []
+        for start in range(0, job.total, self.batch_size):
+            if job.cancel_requested.is_set():
+                self._finish(job, CANCELLED)
+                return
+            batch = self.rules_engine.evaluate(job.logs[start:start + self.batch_size], ruleset)
+            vulnerabilities.extend(batch)
+            severity_summary(batch, job.summary)
+            job.processed = min(job.total, start + self.batch_size)
+
+        # Once stored, the findings are served from the database, not kept with the job
+        save_report(job.scan_id, vulnerabilities)
+        self._finish(job, COMPLETED)
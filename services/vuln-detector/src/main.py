@@ -1,11 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .routes import router
-from .database import engine, Base
+from .routes import router, rules_engine, scan_jobs
+from .database import database
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create DB tables once the database is reachable
+    await database.connect()
+    rules_engine.start_watching()
+    scan_jobs.start()
+    yield
+    rules_engine.stop_watching()
+    scan_jobs.stop()
+    await database.dispose()
 
-app = FastAPI(title="VulnDetector Service")
+app = FastAPI(title="VulnDetector Service", lifespan=lifespan)
 
 app.include_router(router)
 
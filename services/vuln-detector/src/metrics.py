@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import List
+
+# Export Prometheus metrics on GET /metrics.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+# Log rules whose single pattern search takes longer than this many seconds; 0 disables it.
+RULES_SLOW_PATTERN_SECONDS = float(os.getenv("RULES_SLOW_PATTERN_SECONDS", "0"))
+# A slow rule is logged at most once per this many seconds.
+SLOW_RULE_LOG_INTERVAL = 60.0
+
+RULE_SECONDS_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 1.0)
+
+
+class ScanMetrics:
+    """Timings of rule evaluation and report storage, and the slow-rule log.
+
+    Only created when METRICS_ENABLED or RULES_SLOW_PATTERN_SECONDS is set;
+    otherwise the engine and storage hold None and skip all timing.
+    """
+
+    content_type = "text/plain; version=0.0.4"  # the response adds the charset
+
+    def __init__(self, export: bool = METRICS_ENABLED, slow_seconds: float = RULES_SLOW_PATTERN_SECONDS):
+        self.export = export
+        self.slow_seconds = slow_seconds
+        self._slow_logged = {}  # rule id -> time last logged
+        self._lock = threading.Lock()
+        if not export:
+            return
+
+        from prometheus_client import CollectorRegistry, Counter as PromCounter, Gauge, Histogram
+        self.registry = CollectorRegistry()
+        self.rule_seconds = Histogram(
+            "vulndetector_rule_pattern_seconds", "Duration of one pattern search of a rule",
+            ["rule_id"], buckets=RULE_SECONDS_BUCKETS, registry=self.registry
+        )
+        self.rule_matches = PromCounter(
+            "vulndetector_rule_matches", "Logs matched by each rule", ["rule_id"], registry=self.registry
+        )
+        self.logs = PromCounter("vulndetector_logs_evaluated", "Logs evaluated", registry=self.registry)
+        self.evaluate_seconds = Histogram(
+            "vulndetector_evaluate_seconds", "Duration of one RulesEngine.evaluate call", registry=self.registry
+        )
+        self.logs_per_second = Gauge(
+            "vulndetector_evaluate_logs_per_second", "Throughput of the last evaluate call", registry=self.registry
+        )
+        self.commit_seconds = Histogram(
+            "vulndetector_db_commit_seconds", "Duration of committing a batch of findings", registry=self.registry
+        )
+        self._rule_seconds = {}  # rule id -> labelled histogram, to skip the labels() lookup
+
+    def rule_searched(self, rule_id: str, seconds: float):
+        if self.export:
+            histogram = self._rule_seconds.get(rule_id)
+            if histogram is None:
+                histogram = self._rule_seconds[rule_id] = self.rule_seconds.labels(rule_id)
+            histogram.observe(seconds)
+        if self.slow_seconds and seconds > self.slow_seconds:
+            self._log_slow_rule(rule_id, seconds)
+
+    def _log_slow_rule(self, rule_id: str, seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._slow_logged.get(rule_id, -SLOW_RULE_LOG_INTERVAL) < SLOW_RULE_LOG_INTERVAL:
+                return
+            self._slow_logged[rule_id] = now
+        print(f"Slow rule {rule_id}: pattern search took {seconds * 1000:.2f} ms, "
+              f"budget is {self.slow_seconds * 1000:.2f} ms")
+
+    def evaluated(self, logs: int, seconds: float, vulnerabilities: List):
+        if not self.export:
+            return
+        self.logs.inc(logs)
+        self.evaluate_seconds.observe(seconds)
+        if seconds > 0:
+            self.logs_per_second.set(logs / seconds)
+        for rule_id, count in Counter(v.rule_id for v in vulnerabilities).items():
+            self.rule_matches.labels(rule_id).inc(count)
+
+    @contextmanager
+    def commit_timer(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.export:
+                self.commit_seconds.observe(time.perf_counter() - start)
+
+    def exposition(self) -> bytes:
+        from prometheus_client import generate_latest
+        return generate_latest(self.registry)
+
+
+scan_metrics = ScanMetrics() if METRICS_ENABLED or RULES_SLOW_PATTERN_SECONDS > 0 else None
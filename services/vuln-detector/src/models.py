@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from .database import Base
 from pydantic import BaseModel
@@ -11,7 +11,29 @@ class VulnerabilityReport(Base):
     id = Column(Integer, primary_key=True, index=True)
     scan_id = Column(String, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    findings = Column(JSON)
+    findings = Column(JSON)  # legacy reports only; findings now live in the findings table
+
+class RuleRecord(Base):
+    # Text of the rules findings refer to, stored once instead of per finding.
+    __tablename__ = "rules"
+
+    id = Column(String, primary_key=True)
+    severity = Column(String)
+    description = Column(Text)
+    remediation = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Finding(Base):
+    __tablename__ = "findings"
+    # Findings of a scan are paged in id order.
+    __table_args__ = (Index("ix_findings_scan_id_id", "scan_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    scan_id = Column(String, nullable=False)
+    rule_id = Column(String, ForeignKey("rules.id"), nullable=False, index=True)
+    severity = Column(String, nullable=False, index=True)
+    affected_resource = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
 # Pydantic Models
 class ScanRequest(BaseModel):
@@ -29,3 +51,23 @@ class ScanResponse(BaseModel):
     scan_id: str
     vulnerabilities: List[Vulnerability]
     summary: Dict[str, int]
+
+class ScanJobStatus(BaseModel):
+    scan_id: str
+    status: str
+    processed: Optional[int] = None
+    total: Optional[int] = None
+    summary: Dict[str, int]
+    error: Optional[str] = None
+    vulnerabilities: Optional[List[Vulnerability]] = None
+
+class FindingPage(BaseModel):
+    scan_id: str
+    findings: List[Vulnerability]
+    next_cursor: Optional[int] = None
+
+class ScanSummary(BaseModel):
+    scan_id: str
+    total: int
+    summary: Dict[str, int]
+    rules: Dict[str, int]
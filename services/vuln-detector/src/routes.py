@@ -1,12 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from .database import get_db
-from .models import ScanRequest, ScanResponse, VulnerabilityReport
-from .rules_engine import RulesEngine
+from typing import Optional
+from .database import database, get_db
+from .models import ScanRequest, ScanResponse, ScanJobStatus, FindingPage, ScanSummary, VulnerabilityReport
+from .findings import save_findings, load_vulnerabilities, page_findings, summarize_scan
+from .rules_engine import RulesEngine, severity_summary
+from .metrics import scan_metrics
+from .jobs import ScanJobQueue, QueueFull, JobExists, COMPLETED, SCAN_BATCH_SIZE
+import json
 import uuid
 
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse for a generator that is still reading the request body.
+
+    StreamingResponse watches for client disconnects by reading request
+    messages itself, which races the generator for body chunks. Here the
+    generator's own reads of the body see a disconnect instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
 router = APIRouter()
 rules_engine = RulesEngine()
+scan_jobs = ScanJobQueue(rules_engine)
 
 @router.post("/scan", response_model=ScanResponse)
 def scan_logs(request: ScanRequest, db: Session = Depends(get_db)):
@@ -16,22 +37,181 @@ def scan_logs(request: ScanRequest, db: Session = Depends(get_db)):
     vulnerabilities = rules_engine.evaluate(request.logs)
     
     # Calculate summary
-    summary = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
-    for v in vulnerabilities:
-        if v.severity in summary:
-            summary[v.severity] += 1
-            
+    summary = severity_summary(vulnerabilities)
+
     # Save report to DB
-    report = VulnerabilityReport(
-        scan_id=scan_id,
-        findings=[v.dict() for v in vulnerabilities]
-    )
-    db.add(report)
-    db.commit()
-    db.refresh(report)
+    save_findings(db, scan_id, vulnerabilities)
     
     return ScanResponse(
         scan_id=scan_id,
         vulnerabilities=vulnerabilities,
         summary=summary
     )
+
+@router.post("/scan/async", response_model=ScanJobStatus, status_code=202)
+def submit_scan(request: ScanRequest):
+    """Queue a scan and return at once; poll GET /scan/{scan_id} for progress."""
+    scan_id = request.scan_id or str(uuid.uuid4())
+    try:
+        job = scan_jobs.submit(scan_id, request.logs)
+    except JobExists:
+        raise HTTPException(status_code=409, detail=f"Scan {scan_id} is already queued or running")
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Scan queue is full, retry later",
+                            headers={"Retry-After": "5"})
+    return job.to_dict()
+
+@router.post("/scan/stream")
+async def scan_log_stream(request: Request, scan_id: Optional[str] = None):
+    """Scan an NDJSON body, one log record per line, as it is received.
+
+    Records are evaluated and their findings stored in batches of
+    SCAN_BATCH_SIZE, so memory depends on the batch size rather than the
+    size of the export. Each finding is streamed back as an NDJSON line,
+    followed after every batch by a progress line with the running summary;
+    the last line carries the final summary. Lines that are not a JSON
+    object are reported as errors and skipped.
+    """
+    scan_id = scan_id or str(uuid.uuid4())
+    ruleset = rules_engine.ruleset  # every batch uses the rules the scan started with
+
+    async def scan_batch(logs, create_report):
+        vulnerabilities = await run_in_threadpool(rules_engine.evaluate, logs, ruleset)
+        if vulnerabilities or create_report:
+            async with database.async_session() as db:
+                await db.run_sync(save_findings, scan_id, vulnerabilities, create_report)
+        return vulnerabilities
+
+    async def stream_findings():
+        summary = severity_summary([])
+        processed = 0
+        errors = 0
+        reported = False
+        batch = []
+        pending = b""
+        line_number = 0
+
+        async def flush(final=False):
+            nonlocal batch, processed, reported
+            # The report row is created with the first batch, even one without findings.
+            vulnerabilities = await scan_batch(batch, not reported)
+            reported = True
+            processed += len(batch)
+            batch = []
+            severity_summary(vulnerabilities, summary)
+            for v in vulnerabilities:
+                yield json.dumps({"finding": v.dict()}) + "\n"
+            if not final:
+                yield json.dumps({"processed": processed, "summary": summary}) + "\n"
+
+        def parse(line):
+            nonlocal errors
+            if not line.strip():
+                return None
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = e
+            if not isinstance(record, dict):
+                errors += 1
+                detail = str(record) if isinstance(record, ValueError) else "record is not a JSON object"
+                return json.dumps({"error": detail, "line": line_number}) + "\n"
+            batch.append(record)
+            return None
+
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                line_number += 1
+                error = parse(line)
+                if error:
+                    yield error
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    async for output in flush():
+                        yield output
+
+        if pending:
+            line_number += 1
+            error = parse(pending)
+            if error:
+                yield error
+        async for output in flush(final=True):
+            yield output
+
+        yield json.dumps({
+            "status": "success",
+            "scan_id": scan_id,
+            "processed": processed,
+            "errors": errors,
+            "summary": summary
+        }) + "\n"
+
+    return RequestStreamingResponse(stream_findings(), media_type="application/x-ndjson")
+
+@router.get("/scan/{scan_id}", response_model=ScanJobStatus)
+def get_scan(scan_id: str, db: Session = Depends(get_db)):
+    job = scan_jobs.get(scan_id)
+    if job is not None and job.status != COMPLETED:
+        return job.to_dict()
+
+    # Findings of completed jobs, synchronous and streamed scans are read back from the database.
+    vulnerabilities = load_vulnerabilities(db, scan_id)
+    if vulnerabilities is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    if job is not None:
+        return ScanJobStatus(**job.to_dict(), vulnerabilities=vulnerabilities)
+    return ScanJobStatus(
+        scan_id=scan_id,
+        status=COMPLETED,
+        summary=severity_summary(vulnerabilities),
+        vulnerabilities=vulnerabilities
+    )
+
+@router.get("/scan/{scan_id}/findings", response_model=FindingPage)
+def list_findings(
+    scan_id: str,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    severity: Optional[str] = None,
+    rule_id: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Page through the findings of a scan; pass next_cursor back as cursor."""
+    findings, next_cursor = page_findings(db, scan_id, cursor, limit, severity, rule_id)
+    return FindingPage(scan_id=scan_id, findings=findings, next_cursor=next_cursor)
+
+@router.get("/scan/{scan_id}/summary", response_model=ScanSummary)
+def get_scan_summary(scan_id: str, db: Session = Depends(get_db)):
+    if db.query(VulnerabilityReport.id).filter(VulnerabilityReport.scan_id == scan_id).first() is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    summary, rules = summarize_scan(db, scan_id)
+    return ScanSummary(scan_id=scan_id, total=sum(rules.values()), summary=summary, rules=rules)
+
+@router.delete("/scan/{scan_id}", response_model=ScanJobStatus)
+def cancel_scan(scan_id: str):
+    job = scan_jobs.cancel(scan_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.to_dict()
+
+@router.get("/admin/rules")
+def get_rules_status():
+    ruleset = rules_engine.ruleset
+    return {"version": ruleset.version, "rules": len(ruleset.rules), "packs": ruleset.packs,
+            "match_cache": ruleset.cache.stats()}
+
+@router.post("/admin/rules/reload")
+def reload_rules():
+    """Reload the rule packs; scans already running finish on the old rules."""
+    try:
+        ruleset = rules_engine.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Rule reload failed: {str(e)}")
+    return {"version": ruleset.version, "rules": len(ruleset.rules), "packs": ruleset.packs}
+
+if scan_metrics is not None and scan_metrics.export:
+    @router.get("/metrics")
+    def get_metrics():
+        """Prometheus metrics; the route only exists when METRICS_ENABLED is set."""
+        return Response(scan_metrics.exposition(), media_type=scan_metrics.content_type)
@@ -1,52 +1,484 @@
 import yaml
 import re
 import os
-from typing import List, Dict, Any
+import glob
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from .models import Vulnerability
+from .metrics import ScanMetrics, scan_metrics
+
+# Directory of rule packs (*.yaml / *.yml), loaded in file name order.
+RULES_DIR = os.getenv("RULES_DIR", os.path.join(os.path.dirname(__file__), "rules"))
+# Optional file the compiled packs are saved to, so new workers skip YAML parsing.
+RULES_CACHE_PATH = os.getenv("RULES_CACHE_PATH")
+# Seconds between checks of RULES_DIR for changed packs; 0 disables watching.
+RULES_WATCH_INTERVAL = float(os.getenv("RULES_WATCH_INTERVAL", "0"))
+# Memory bound of the memo of pattern matches per (match_key, value); 0 disables it.
+RULES_MATCH_CACHE_BYTES = int(os.getenv("RULES_MATCH_CACHE_BYTES", str(16 * 1024 * 1024)))
+# Longer values are never memoized across batches.
+RULES_MATCH_CACHE_MAX_VALUE = int(os.getenv("RULES_MATCH_CACHE_MAX_VALUE", "1024"))
+
+
+def severity_summary(vulnerabilities: List[Vulnerability], summary: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Count vulnerabilities per severity, adding to summary if given."""
+    if summary is None:
+        summary = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    for v in vulnerabilities:
+        if v.severity in summary:
+            summary[v.severity] += 1
+    return summary
+
+
+def is_path(match_key: str) -> bool:
+    return "." in match_key or "[]" in match_key
+
+
+def _parse_path(match_key: str) -> List[Tuple[str, int]]:
+    """Split a match_key such as job.steps[].uses into (field, number of []) steps."""
+    steps = []
+    for field in match_key.split("."):
+        depth = 0
+        while field.endswith("[]"):
+            field = field[:-2]
+            depth += 1
+        steps.append((field, depth))
+    return steps
+
+
+def _expand(value: Any, depth: int) -> List[Any]:
+    items = [value]
+    for _ in range(depth):
+        items = [item for items_list in items if isinstance(items_list, list) for item in items_list]
+    return items
+
+
+class PathIndex:
+    """Trie of the nested match_key paths of a rule set.
+
+    Paths are compiled once into a trie of fields, so a log is walked a
+    single time, only along the branches some rule needs, and rules whose
+    paths share a prefix share its traversal. A field followed by []
+    stands for every element of the list it holds.
+    """
+
+    def __init__(self, match_keys: List[str]):
+        self._root = ({}, [])  # ({field: [(depth, child node)]}, match keys ending here)
+        for match_key in match_keys:
+            node = self._root
+            for field, depth in _parse_path(match_key):
+                branches = node[0].setdefault(field, [])
+                for branch_depth, child in branches:
+                    if branch_depth == depth:
+                        break
+                else:
+                    child = ({}, [])
+                    branches.append((depth, child))
+                node = child
+            node[1].append(match_key)
+
+    def __bool__(self) -> bool:
+        return bool(self._root[0])
+
+    def values(self, log: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """Values found in log for each path, leaving out paths with none."""
+        found = {}
+        self._walk(log, self._root, found)
+        return found
+
+    def _walk(self, record: Dict[str, Any], node, found: Dict[str, List[Any]]):
+        for field, branches in node[0].items():
+            if field not in record:
+                continue
+            for depth, child in branches:
+                for item in _expand(record[field], depth):
+                    for match_key in child[1]:
+                        found.setdefault(match_key, []).append(item)
+                    if child[0] and isinstance(item, dict):
+                        self._walk(item, child, found)
+
+
+def resolve_match_key(log: Dict[str, Any], match_key: str) -> List[Any]:
+    """Values of match_key in log, walking the path one log at a time.
+
+    A field named match_key itself, as in a flattened record, wins over the
+    path. Reference for PathIndex, which resolves every path of a rule set
+    in one walk.
+    """
+    if match_key in log:
+        return [log[match_key]]
+    if not is_path(match_key):
+        return []
+    records = [log]
+    for field, depth in _parse_path(match_key):
+        records = [item for record in records if isinstance(record, dict) and field in record
+                   for item in _expand(record[field], depth)]
+    return records
+
+
+class MatchCache:
+    """LRU memo of the pattern rules matching a (match_key, value) pair.
+
+    Sizes are estimated from the value length plus a fixed per-entry
+    overhead, and the least recently used entries are evicted to stay
+    under max_bytes.
+    """
+
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = RULES_MATCH_CACHE_BYTES, max_value: int = RULES_MATCH_CACHE_MAX_VALUE):
+        self.max_bytes = max_bytes
+        self.max_value = max_value
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (match_key, value) -> (positions, size)
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tuple[int, ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def put(self, key: Tuple[str, str], positions: Tuple[int, ...]):
+        if len(key[1]) > self.max_value:
+            return
+        size = len(key[0]) + len(key[1]) + 8 * len(positions) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (positions, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class RuleSet:
+    """Rules compiled for evaluation.
+
+    A rule set is never modified once built: reloading builds a new one and
+    swaps it in, so a scan keeps evaluating against the set it started with.
+    Its match cache goes with it, so reloading also invalidates the cache.
+    """
+
+    def __init__(self, compiled_rules: List[Tuple[Dict, Optional[re.Pattern]]], packs: List[Dict] = (),
+                 cache_bytes: int = RULES_MATCH_CACHE_BYTES, metrics: Optional[ScanMetrics] = None):
+        self.rules = [rule for rule, _ in compiled_rules]
+        self.cache = MatchCache(cache_bytes)
+        self.metrics = metrics
+        self.packs = list(packs)
+        self.version = hashlib.sha256(
+            "".join(pack["sha256"] for pack in self.packs).encode()
+        ).hexdigest()[:16]
+        self._index_rules(compiled_rules)
+
+    def _index_rules(self, compiled_rules):
+        """Index the rules by match_key so a log only meets the rules for its keys.
+
+        For each key, match_value rules sit in a map from value to rule
+        positions and match_pattern rules keep their precompiled pattern.
+        Rules that also match an empty value are remembered separately,
+        because a log without their key is matched against "" (see
+        RulesEngine._match_rule). Nested match_key paths are resolved
+        through a PathIndex.
+        """
+        self._index = {}  # match_key -> ({value: [rule position]}, [(pattern, rule position)])
+        self._empty_matches = []  # (match_key, rule position)
+
+        for position, (rule, pattern) in enumerate(compiled_rules):
+            match_key = rule.get("match_key")
+            if not match_key:
+                continue
+            values, patterns = self._index.setdefault(match_key, ({}, []))
+
+            if "match_value" in rule:
+                value = rule["match_value"]
+                if not isinstance(value, str):
+                    continue  # never equal to a stringified log value
+                values.setdefault(value, []).append(position)
+                matches_empty = value == ""
+            elif pattern is not None:
+                patterns.append((pattern, position))
+                matches_empty = pattern.search("") is not None
+            else:
+                continue
+
+            if matches_empty:
+                self._empty_matches.append((match_key, position))
+
+        self._paths = PathIndex([match_key for match_key in self._index if is_path(match_key)])
+
+    def matching_rules(self, log: Dict[str, Any], memo: Optional[Dict] = None) -> List[int]:
+        """Positions of the rules matching log, in rule order.
+
+        memo, when given, remembers pattern results for the values seen in
+        the current batch, so each distinct value is searched at most once
+        per batch even when it is too long for the shared cache.
+        """
+        matched = []
+        for key, raw_value in log.items():
+            entry = self._index.get(key)
+            if entry is None:
+                continue
+            values, patterns = entry
+            log_value = str(raw_value)
+            matched.extend(values.get(log_value, ()))
+            if patterns:
+                matched.extend(self._pattern_matches(key, log_value, patterns, memo))
+
+        found = self._paths.values(log) if self._paths else {}
+        for key, raw_values in found.items():
+            if key in log:
+                continue  # already matched as a flattened field
+            values, patterns = self._index[key]
+            positions = set()  # a rule matches a log once, however many elements match
+            for raw_value in raw_values:
+                log_value = str(raw_value)
+                positions.update(values.get(log_value, ()))
+                if patterns:
+                    positions.update(self._pattern_matches(key, log_value, patterns, memo))
+            matched.extend(positions)
+
+        for match_key, position in self._empty_matches:
+            if match_key not in log and match_key not in found:
+                matched.append(position)
+
+        matched.sort()
+        return matched
+
+    def _pattern_matches(self, key: str, value: str, patterns, memo: Optional[Dict]) -> Tuple[int, ...]:
+        cache_key = (key, value)
+        if memo is not None:
+            positions = memo.get(cache_key)
+            if positions is not None:
+                self.cache.hit()
+                return positions
+        positions = self.cache.get(cache_key)
+        if positions is None:
+            if self.metrics is None:
+                positions = tuple(position for pattern, position in patterns if pattern.search(value))
+            else:
+                positions = self._timed_search(value, patterns)
+            self.cache.put(cache_key, positions)
+        if memo is not None:
+            memo[cache_key] = positions
+        return positions
+
+    def _timed_search(self, value: str, patterns) -> Tuple[int, ...]:
+        positions = []
+        for pattern, position in patterns:
+            start = time.perf_counter()
+            found = pattern.search(value)
+            self.metrics.rule_searched(self.rules[position]["id"], time.perf_counter() - start)
+            if found:
+                positions.append(position)
+        return tuple(positions)
+
+
+def _compile_pack(data: bytes) -> List[Tuple[Dict, Optional[re.Pattern]]]:
+    document = yaml.safe_load(data) or {}
+    compiled = []
+    for rule in document.get("rules", []):
+        pattern = None
+        if "match_value" not in rule and "match_pattern" in rule:
+            pattern = re.compile(rule["match_pattern"])
+        compiled.append((rule, pattern))
+    return compiled
+
 
 class RulesEngine:
-    def __init__(self, rules_path: str = "src/rules/default_rules.yaml"):
-        self.rules = self._load_rules(rules_path)
+    def __init__(self, rules_path: Optional[str] = None, rules_dir: str = RULES_DIR,
+                 cache_path: Optional[str] = RULES_CACHE_PATH, metrics: Optional[ScanMetrics] = scan_metrics):
+        # A single rules_path is still accepted and loaded as the only pack.
+        self.rules_path = rules_path
+        self.metrics = metrics
+        self.rules_dir = rules_dir
+        self.cache_path = cache_path
+        self._pack_cache = self._read_cache()  # path -> (mtime, sha256, compiled rules)
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._loaded_fingerprint = None
+        self._ruleset = RuleSet([])
+        self.reload()
+
+    @property
+    def rules(self) -> List[Dict]:
+        return self._ruleset.rules
+
+    @property
+    def ruleset(self) -> RuleSet:
+        return self._ruleset
+
+    def _pack_paths(self) -> List[str]:
+        if self.rules_path:
+            return [self.rules_path] if os.path.exists(self.rules_path) else []
+        return sorted(
+            glob.glob(os.path.join(self.rules_dir, "*.yaml")) + glob.glob(os.path.join(self.rules_dir, "*.yml"))
+        )
 
-    def _load_rules(self, path: str) -> List[Dict]:
-        if not os.path.exists(path):
-            return []
-        with open(path, "r") as f:
-            data = yaml.safe_load(f)
-            return data.get("rules", [])
+    def reload(self) -> RuleSet:
+        """Load every rule pack and atomically swap in the new rule set.
 
-    def evaluate(self, logs: List[Dict[str, Any]]) -> List[Vulnerability]:
+        Packs whose mtime, or failing that content hash, is unchanged reuse
+        their compiled rules. If any pack fails to load, an exception is
+        raised and the current rule set stays in place.
+        """
+        with self._reload_lock:
+            fingerprint = self._fingerprint()
+            paths = self._pack_paths()
+            if not paths:
+                print(f"No rule packs found in {self.rules_path or self.rules_dir}")
+
+            compiled_rules = []
+            packs = []
+            pack_cache = {}
+            for path in paths:
+                mtime = os.stat(path).st_mtime_ns
+                cached = self._pack_cache.get(path)
+                if cached and cached[0] == mtime:
+                    digest, compiled = cached[1], cached[2]
+                else:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    digest = hashlib.sha256(data).hexdigest()
+                    if cached and cached[1] == digest:
+                        compiled = cached[2]
+                    else:
+                        compiled = _compile_pack(data)
+                pack_cache[path] = (mtime, digest, compiled)
+                compiled_rules.extend(compiled)
+                packs.append({"path": path, "sha256": digest, "rules": len(compiled)})
+
+            ruleset = RuleSet(compiled_rules, packs, metrics=self.metrics)
+            changed = pack_cache != self._pack_cache
+            self._pack_cache = pack_cache
+            self._loaded_fingerprint = fingerprint
+            self._ruleset = ruleset
+            if changed:
+                self._write_cache()
+            return ruleset
+
+    def _read_cache(self) -> Dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable rules cache {self.cache_path}: {e}")
+            return {}
+
+    def _write_cache(self):
+        if not self.cache_path:
+            return
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(self._pack_cache, f)
+        os.replace(temp_path, self.cache_path)
+
+    def _fingerprint(self) -> List[Tuple[str, int, int]]:
+        fingerprint = []
+        for path in self._pack_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        return fingerprint
+
+    def start_watching(self, interval: float = RULES_WATCH_INTERVAL):
+        """Reload in a background thread whenever a rule pack changes."""
+        if interval <= 0 or self._watcher is not None:
+            return
+        stop = threading.Event()
+
+        def watch():
+            failed = None
+            while not stop.wait(interval):
+                current = self._fingerprint()
+                if current in (self._loaded_fingerprint, failed):
+                    continue
+                failed = current
+                try:
+                    ruleset = self.reload()
+                    print(f"Reloaded rules: version {ruleset.version}, {len(ruleset.rules)} rules")
+                except Exception as e:
+                    print(f"Rule reload failed, keeping current rules: {e}")
+
+        self._watcher = (threading.Thread(target=watch, daemon=True), stop)
+        self._watcher[0].start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher[1].set()
+            self._watcher = None
+
+    def evaluate(self, logs: List[Dict[str, Any]], ruleset: Optional[RuleSet] = None) -> List[Vulnerability]:
         vulnerabilities = []
-        
+        if ruleset is None:
+            ruleset = self._ruleset  # fixed for the whole scan, even if rules reload
+        memo = {}
+        start = time.perf_counter() if self.metrics is not None else 0.0
+
         for log in logs:
-            for rule in self.rules:
-                if self._match_rule(log, rule):
-                    vulnerabilities.append(
-                        Vulnerability(
-                            rule_id=rule["id"],
-                            severity=rule["severity"],
-                            description=rule["description"],
-                            affected_resource=log.get("source", "unknown"),
-                            remediation=rule.get("remediation")
-                        )
+            for position in ruleset.matching_rules(log, memo):
+                rule = ruleset.rules[position]
+                vulnerabilities.append(
+                    Vulnerability(
+                        rule_id=rule["id"],
+                        severity=rule["severity"],
+                        description=rule["description"],
+                        affected_resource=log.get("source", "unknown"),
+                        remediation=rule.get("remediation")
                     )
+                )
+
+        if self.metrics is not None:
+            self.metrics.evaluated(len(logs), time.perf_counter() - start, vulnerabilities)
         return vulnerabilities
 
     def _match_rule(self, log: Dict[str, Any], rule: Dict) -> bool:
-        # Simple matching logic
+        # Reference semantics of a single rule; evaluate() uses the
+        # precompiled index of the current RuleSet instead.
         match_key = rule.get("match_key")
-        
+
         if not match_key:
             return False
-            
-        # Check if key exists in log (flattened or direct)
-        # For simplicity, we assume direct key access or simple content search
-        log_value = str(log.get(match_key, ""))
-        
+
+        # Check if key exists in log (flattened or direct), else follow it as a
+        # nested path such as job.steps[].uses; a missing key reads as ""
+        log_values = [str(value) for value in resolve_match_key(log, match_key)] or [""]
+
         if "match_value" in rule:
-            return log_value == rule["match_value"]
-            
+            return rule["match_value"] in log_values
+
         if "match_pattern" in rule:
-            return re.search(rule["match_pattern"], log_value) is not None
-            
+            return any(re.search(rule["match_pattern"], log_value) is not None for log_value in log_values)
+
         return False
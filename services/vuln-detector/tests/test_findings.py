@@ -0,0 +1,81 @@
+import threading
+import time
+
+from src import findings
+from src.database import Base, database
+from src.findings import load_vulnerabilities, page_findings, save_findings, summarize_scan
+from src.models import Finding, Vulnerability, VulnerabilityReport
+
+Base.metadata.create_all(database.engine)
+
+
+def vulnerability(rule_id, severity="HIGH"):
+    return Vulnerability(rule_id=rule_id, severity=severity, description=f"{rule_id} found",
+                         affected_resource="workflow.yml", remediation="fix it")
+
+
+def test_concurrent_scans_store_the_same_new_rule():
+    findings._stored_rules.clear()
+    first = database.session()
+    findings._store_rules(first, [vulnerability("NEW-RULE")])
+    first.flush()  # holds the new rule, uncommitted
+
+    errors = []
+
+    def second_scan():
+        db = database.session()
+        try:
+            save_findings(db, "scan-b", [vulnerability("NEW-RULE")])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    thread = threading.Thread(target=second_scan)
+    thread.start()
+    time.sleep(0.3)  # the second scan is now waiting on the first one's write
+    first.commit()
+    first.close()
+    thread.join()
+
+    assert errors == []
+    db = database.session()
+    assert db.query(Finding).filter(Finding.scan_id == "scan-b").count() == 1
+    db.close()
+
+
+def test_summary_includes_legacy_inline_findings():
+    db = database.session()
+    db.add(VulnerabilityReport(scan_id="legacy", findings=[
+        vulnerability("OLD-1").dict(), vulnerability("OLD-2", "LOW").dict()
+    ]))
+    db.commit()
+    save_findings(db, "legacy", [vulnerability("OLD-1"), vulnerability("NEW-1", "MEDIUM")], create_report=False)
+
+    summary, rules = summarize_scan(db, "legacy")
+    assert summary == {"HIGH": 2, "MEDIUM": 1, "LOW": 1}
+    assert rules == {"OLD-1": 2, "OLD-2": 1, "NEW-1": 1}
+    assert len(load_vulnerabilities(db, "legacy")) == sum(rules.values())
+    db.close()
+
+
+def test_findings_of_legacy_scans_are_paged_inline():
+    db = database.session()
+    db.add(VulnerabilityReport(scan_id="legacy-only", findings=[
+        vulnerability(f"OLD-{i}", "LOW" if i % 2 else "HIGH").dict() for i in range(5)
+    ]))
+    db.commit()
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = page_findings(db, "legacy-only", cursor, 2)
+        pages.append([finding.rule_id for finding in page])
+        if cursor is None:
+            break
+    assert pages == [["OLD-0", "OLD-1"], ["OLD-2", "OLD-3"], ["OLD-4"]]
+    assert sum(map(len, pages)) == sum(summarize_scan(db, "legacy-only")[1].values())
+
+    high, cursor = page_findings(db, "legacy-only", None, 10, severity="HIGH")
+    assert [finding.rule_id for finding in high] == ["OLD-0", "OLD-2", "OLD-4"] and cursor is None
+    assert page_findings(db, "legacy-only", None, 10, rule_id="OLD-3")[0] == [vulnerability("OLD-3", "LOW")]
+    db.close()
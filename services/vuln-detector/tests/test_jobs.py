@@ -0,0 +1,45 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.database import Base, database
+from src.jobs import COMPLETED, ScanJobQueue
+from src.models import Vulnerability
+from src.routes import router
+
+Base.metadata.create_all(database.engine)
+
+
+class RulesEngine:
+    """Finds one vulnerability per log."""
+    ruleset = None
+
+    def evaluate(self, logs, ruleset):
+        return [
+            Vulnerability(rule_id=f"RULE-{log['n'] % 3}", severity="HIGH", description="found",
+                          affected_resource=f"log {log['n']}", remediation="fix it")
+            for log in logs
+        ]
+
+
+def test_completed_jobs_serve_findings_from_the_database(monkeypatch):
+    jobs = ScanJobQueue(RulesEngine(), workers=1, batch_size=4)
+    monkeypatch.setattr("src.routes.scan_jobs", jobs)
+    jobs.start()
+    try:
+        job = jobs.submit("job-scan", [{"n": n} for n in range(10)])
+        deadline = time.time() + 10
+        while not job.finished and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        jobs.stop()
+
+    assert job.status == COMPLETED
+    assert not hasattr(job, "vulnerabilities") and "vulnerabilities" not in job.to_dict()
+
+    app = FastAPI()
+    app.include_router(router)
+    status = TestClient(app).get("/scan/job-scan").json()
+    assert (status["status"], status["processed"], status["total"]) == (COMPLETED, 10, 10)
+    assert [finding["affected_resource"] for finding in status["vulnerabilities"]] == [f"log {n}" for n in range(10)]